@@ -0,0 +1,100 @@
+"""
+Measure the cost of dispatching past events to callbacks: time and object creations per event.
+Coroutines and wake up records created are counted with a profile hook, a coroutine being created the first time its
+frame is entered. Counts are the difference between two runs of different lengths so the objects created once per run
+do not count. The baseline dispatches like process_stream did before wake up records were reused: a sleep coroutine
+and a new record to wait for each event, then a coroutine wrapping the callback.
+"""
+
+import asyncio
+import inspect
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Coroutine, Iterable, List, Tuple
+
+import async_stream_processing as asp
+from async_stream_processing import processor
+
+EVENT_COUNT = 100_000
+COUNTED_EVENT_COUNT = 10_000
+REPEAT = 3
+
+
+class Counter:
+    def __init__(self):
+        self.coroutines = 0
+        self.wake_ups = 0
+        # frames are kept alive so that their ids are not reused by new ones
+        self.frames = {}
+
+    def profile(self, frame, event: str, _arg: Any) -> None:
+        if event != "call":
+            return
+        code = frame.f_code
+        if code is processor.Future.__init__.__code__:
+            self.wake_ups += 1
+        elif code.co_flags & inspect.CO_COROUTINE and id(frame) not in self.frames:
+            self.frames[id(frame)] = frame
+            self.coroutines += 1
+
+
+def create_events(count: int):
+    start_time = datetime(2025, 1, 1)
+    return start_time, [(start_time + timedelta(seconds=index), index) for index in range(count)]
+
+
+async def baseline(callback: Callable, past: Iterable[Tuple[datetime, Any]]) -> None:
+    for event_time, value in past:
+        await asp.sleep(event_time)
+        await processor.call_coroutine(callback, event_time, (value,))
+
+
+def callback(_event_time: datetime, _value: int):
+    pass
+
+
+async def async_callback(_event_time: datetime, _value: int):
+    pass
+
+
+def create_coroutines(name: str, count: int) -> Tuple[datetime, List[Coroutine]]:
+    start_time, events = create_events(count)
+    if name == "baseline":
+        return start_time, [baseline(callback, events)]
+    return start_time, [asp.process_stream(callback=async_callback if name == "async" else callback, past=events)]
+
+
+def run(name: str, count: int) -> float:
+    start_time, coroutines = create_coroutines(name, count)
+    started = time.perf_counter()
+    asyncio.run(asp.run(coroutines, start_time=start_time))
+    return (time.perf_counter() - started) / count
+
+
+def count_creations(name: str, count: int) -> Counter:
+    start_time, coroutines = create_coroutines(name, count)
+    counter = Counter()
+    sys.setprofile(counter.profile)
+    try:
+        asyncio.run(asp.run(coroutines, start_time=start_time))
+    finally:
+        sys.setprofile(None)
+    return counter
+
+
+def main():
+    for name in ["baseline", "sync", "async"]:
+        duration = min(run(name, EVENT_COUNT) for _ in range(REPEAT))
+        short = count_creations(name, COUNTED_EVENT_COUNT)
+        long = count_creations(name, 2 * COUNTED_EVENT_COUNT)
+        coroutines = (long.coroutines - short.coroutines) / COUNTED_EVENT_COUNT
+        wake_ups = (long.wake_ups - short.wake_ups) / COUNTED_EVENT_COUNT
+        print(
+            f"{name:>8}: {duration * 1e6:.2f}us/event, {coroutines:.2f} coroutines/event, "
+            f"{wake_ups:.2f} wake up records/event"
+        )
+
+
+if __name__ == "__main__":
+    main()
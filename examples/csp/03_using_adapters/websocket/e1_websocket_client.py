@@ -4,18 +4,14 @@ This requires websocket_server.py to be running.
 
 import async_stream_processing as asp
 import asyncio
-import websockets  # pyright: ignore[reportMissingImports]
+from async_stream_processing.websocket import WebSocketSource
 
 
-async def data(uri: str, number: int):
-    try:
-        async with websockets.connect(uri) as websocket:
-            await websocket.send(str(number))
-            while True:
-                value = await websocket.recv()
-                yield asp.now(), value
-    except websockets.exceptions.ConnectionClosedOK:
-        pass
+def subscribe(number: int):
+    async def on_connect(websocket):
+        await websocket.send(str(number))
+
+    return on_connect
 
 
 def main():
@@ -24,7 +20,11 @@ def main():
             [
                 asp.process_stream(
                     callback=print,
-                    future=data("ws://localhost:8765", 5),
+                    future=WebSocketSource(
+                        "ws://localhost:8765",
+                        on_connect=subscribe(5),
+                        stop_on_close=True,
+                    ),
                 )
             ],
         )
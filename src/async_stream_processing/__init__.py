@@ -1,12 +1,49 @@
-from . import testing
-from .processor import run, process_stream, now, call_later, sleep, timer
+from . import cache, ipc, journal, logging, stats, store, testing, websocket
+from .conflation import Conflator, conflate
+from .processor import (
+    run,
+    run_scenarios,
+    process_stream,
+    broadcast,
+    now,
+    call_later,
+    pacing_report,
+    queue_depths,
+    sleep,
+    timer,
+    NotSeekable,
+)
+from .recorder import Recorder
+from .sources import ArraySource, ListSource, Prefetch, ReorderBuffer, Seekable
+from .spill import SpillStore
 
 __all__ = [
+    "ArraySource",
+    "broadcast",
+    "cache",
     "call_later",
+    "conflate",
+    "Conflator",
+    "ipc",
+    "journal",
+    "ListSource",
+    "logging",
+    "NotSeekable",
     "now",
     "run",
+    "run_scenarios",
     "sleep",
+    "SpillStore",
+    "stats",
+    "store",
     "testing",
+    "pacing_report",
+    "Prefetch",
     "process_stream",
+    "queue_depths",
+    "Recorder",
+    "ReorderBuffer",
+    "Seekable",
     "timer",
+    "websocket",
 ]
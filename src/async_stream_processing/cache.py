@@ -0,0 +1,260 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Sequence, Union
+
+from . import processor as engine
+from .recorder import MICROSECOND, Recorder
+
+META_FILE = "meta.json"
+STATE_FILE = "state.pickle"
+OUTPUTS_DIRECTORY = "outputs"
+
+
+def source_files(sources: Sequence[Union[str, Path]]) -> List[Path]:
+    files = []
+    for source in sources:
+        path = Path(source).resolve()
+        files.extend(sorted(file for file in path.rglob("*") if file.is_file()) if path.is_dir() else [path])
+    return files
+
+
+def file_hash(path: Path, size: Optional[int] = None) -> str:
+    """
+    sha256 of the first size bytes of a file, of the whole file if size is None.
+    """
+    digest = hashlib.sha256()
+    remaining = path.stat().st_size if size is None else size
+    with open(path, "rb") as file:
+        while remaining > 0:
+            chunk = file.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def code_version(code: Any) -> str:
+    if isinstance(code, str):
+        return code
+    try:
+        return hashlib.sha256(inspect.getsource(code).encode()).hexdigest()
+    except (OSError, TypeError) as error:
+        raise ValueError(f"The source of {code!r} is unavailable, pass the version of the code as a string.") from error
+
+
+class ResultCache:
+    """
+    On disk cache of deterministic replays, keyed by a fingerprint of their past sources, code version and parameters.
+    A run whose sources have the same content returns the cached end state and restores the files of its recorders
+    without running. A run whose source files were only appended to, or whose source directories only gained files,
+    resumes from the cached end state just after the last past event of the cached run, which requires the appended
+    events to be later than it. Resuming requires every past source to be seekable: the run is started again from
+    scratch otherwise. Only the state and recorders are cached, not timers or sleeping coroutines, so a run which
+    resumed any of them after its last past event is never resumed either: they would have run between the cached and
+    the appended events. Entries are evicted least recently used first once the cache exceeds max_size bytes.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_size: int = 1 << 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.last_outcome: Optional[str] = None  # "hit", "resume" or "miss"
+
+    def key(
+        self,
+        sources: Sequence[Union[str, Path]],
+        start_time: datetime,
+        recorders: Sequence[Recorder],
+        code: Any,
+        parameters: Any,
+    ) -> str:
+        description = {
+            "sources": [str(Path(source).resolve()) for source in sources],
+            "start_time": start_time.isoformat(),
+            "recorders": [
+                (str(recorder.path.resolve()), recorder.types, recorder.chunk_size) for recorder in recorders
+            ],
+            "code": code_version(code),
+            "parameters": parameters,
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+    async def run(
+        self,
+        build: Callable[[Any], List[Coroutine]],
+        state: Any,
+        sources: Sequence[Union[str, Path]],
+        start_time: datetime,
+        recorders: Sequence[Recorder] = (),
+        code: Any = None,
+        parameters: Any = None,
+    ) -> Any:
+        """
+        Run the coroutines returned by build, unless the run is cached, and write the files of the recorders.
+        :param build: Function returning the coroutines to run given the state, which they should update.
+        :param state: Initial state, which must be picklable.
+        :param sources: Paths of the files or directories read by the past sources.
+        :param start_time: Start time of the run.
+        :param recorders: Recorders whose files are cached, closed once the run has completed.
+        :param code: Version of the code, either a string or an object such as a class or module whose source is hashed,
+            the class of the state by default.
+        :param parameters: Parameters of the run, which must be serialisable to JSON or have a deterministic repr.
+        :return: State at the end of the run.
+        """
+        if code is None:
+            code = type(state)
+        entry = self.directory / self.key(sources, start_time, recorders, code, parameters)
+        files = source_files(sources)
+        meta = self.load_meta(entry)
+        self.last_outcome = "miss"
+        if meta is not None:
+            if unchanged(meta["files"], meta["hashes"], files):
+                self.last_outcome = "hit"
+            elif meta.get("resumable") and extends(meta["files"], meta["hashes"], files):
+                self.last_outcome = "resume"
+        end_time: Optional[datetime] = None
+        if meta is not None and self.last_outcome != "miss":
+            os.utime(entry / META_FILE)  # recently used
+            restored = self.restore_outputs(entry, recorders)
+            with open(entry / STATE_FILE, "rb") as file:
+                cached_state, snapshots = pickle.load(file)
+            if self.last_outcome == "hit":
+                if meta["files"] != file_stats(files):
+                    # same content with new modification times, eg: a fresh checkout
+                    meta["files"] = file_stats(files)
+                    self.write_meta(entry, meta)
+                return cached_state
+            end_time = datetime.fromisoformat(meta["end_time"]) if meta["end_time"] else None
+            initial_snapshots = [recorder.snapshot() for recorder in recorders]
+            for recorder, snapshot in zip(recorders, snapshots):
+                recorder.restore(snapshot)
+            # events at the end time were processed by the cached run
+            resume_time = start_time if end_time is None else end_time + MICROSECOND
+            coroutines = build(cached_state)
+            try:
+                await engine.run(coroutines, start_time=resume_time, require_seek=True)
+                state = cached_state
+            except engine.NotSeekable:
+                for coroutine in coroutines:
+                    coroutine.close()
+                for recorder, snapshot in zip(recorders, initial_snapshots):
+                    recorder.restore(snapshot)
+                for path in restored:
+                    path.unlink(missing_ok=True)
+                self.last_outcome = "miss"
+                end_time = None
+        if self.last_outcome == "miss":
+            await engine.run(build(state), start_time=start_time)
+        last_event_time = engine.processor.last_event_time
+        end_time = last_event_time if last_event_time is not None else end_time
+        # timers or coroutines due after the last past event are not part of the cached state
+        resumable = engine.processor.latest_due_time <= (start_time if end_time is None else end_time)
+        snapshots = [recorder.snapshot() for recorder in recorders]
+        state_payload = pickle.dumps((state, snapshots), pickle.HIGHEST_PROTOCOL)
+        for recorder in recorders:
+            recorder.close()
+        self.store(entry, files, end_time, resumable, state_payload, recorders)
+        self.evict()
+        return state
+
+    @staticmethod
+    def load_meta(entry: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(entry / META_FILE) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def restore_outputs(entry: Path, recorders: Sequence[Recorder]) -> List[Path]:
+        restored = []
+        for index, recorder in enumerate(recorders):
+            for cached in sorted((entry / OUTPUTS_DIRECTORY / str(index)).iterdir()):
+                path = recorder.path.with_name(cached.name)
+                shutil.copyfile(cached, path)
+                restored.append(path)
+        return restored
+
+    @staticmethod
+    def write_meta(entry: Path, meta: Dict[str, Any]) -> None:
+        with open(entry / META_FILE, "w") as file:
+            json.dump(meta, file)
+
+    def store(
+        self,
+        entry: Path,
+        files: List[Path],
+        end_time: Optional[datetime],
+        resumable: bool,
+        state_payload: bytes,
+        recorders: Sequence[Recorder],
+    ) -> None:
+        shutil.rmtree(entry, ignore_errors=True)
+        for index, recorder in enumerate(recorders):
+            outputs = entry / OUTPUTS_DIRECTORY / str(index)
+            outputs.mkdir(parents=True)
+            for path in recorder.files():
+                shutil.copyfile(path, outputs / path.name)
+        entry.mkdir(parents=True, exist_ok=True)
+        (entry / STATE_FILE).write_bytes(state_payload)
+        meta = {
+            "files": file_stats(files),
+            "hashes": {str(file): file_hash(file) for file in files},
+            "end_time": end_time.isoformat() if end_time is not None else None,
+            "resumable": resumable,
+        }
+        # written last, an entry without it is incomplete and ignored
+        self.write_meta(entry, meta)
+
+    def evict(self) -> None:
+        entries = []
+        for entry in self.directory.iterdir():
+            meta = entry / META_FILE
+            size = sum(file.stat().st_size for file in entry.rglob("*") if file.is_file())
+            entries.append((meta.stat().st_mtime_ns if meta.exists() else 0, size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def file_stats(files: List[Path]) -> Dict[str, List[int]]:
+    return {str(file): [file.stat().st_size, file.stat().st_mtime_ns] for file in files}
+
+
+def unchanged(cached_files: Dict[str, List[int]], hashes: Dict[str, str], files: List[Path]) -> bool:
+    """
+    Whether files are the cached ones with the same content, which is only hashed when their modification time changed.
+    """
+    if sorted(cached_files) != sorted(str(file) for file in files):
+        return False
+    for file in files:
+        size, mtime = cached_files[str(file)]
+        if file.stat().st_size != size:
+            return False
+        if file.stat().st_mtime_ns != mtime and file_hash(file) != hashes[str(file)]:
+            return False
+    return True
+
+
+def extends(cached_files: Dict[str, List[int]], hashes: Dict[str, str], files: List[Path]) -> bool:
+    """
+    Whether files only extend the cached ones, ie: each cached file still starts with the same content.
+    """
+    current = {str(file): file for file in files}
+    for name, (size, mtime) in cached_files.items():
+        file = current.get(name)
+        if file is None or file.stat().st_size < size:
+            return False
+        if [file.stat().st_size, file.stat().st_mtime_ns] != [size, mtime] and file_hash(file, size) != hashes[name]:
+            return False
+    return True
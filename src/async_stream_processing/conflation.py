@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterable, Callable, Coroutine, Dict, Hashable, NamedTuple, Optional, Tuple, Union
+
+from . import processor as engine
+from .recorder import EPOCH
+
+AGGREGATIONS = ("last", "sum", "ohlc")
+
+
+class OHLC(NamedTuple):
+    open: Any
+    high: Any
+    low: Any
+    close: Any
+
+
+class Conflator:
+    """
+    Callback aggregating events into bars of interval length, aligned on multiples of the interval since the epoch in
+    virtual time, and calling callback once per bar, at its end, with the end time and aggregated value of the bar.
+    Values are aggregated with how, one of "last", "sum" or "ohlc", after extracting them from event values with field
+    if given. If key is given, values are aggregated per key and callback receives a dictionary of values by key.
+    """
+
+    def __init__(
+        self,
+        callback: Callable,
+        interval: Union[float, timedelta],
+        key: Optional[Callable[[Any], Hashable]] = None,
+        how: str = "last",
+        field: Optional[Callable[[Any], Any]] = None,
+    ):
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {how!r}, expected one of {', '.join(AGGREGATIONS)}.")
+        self.callback = callback
+        self.interval = interval if isinstance(interval, timedelta) else timedelta(seconds=interval)
+        self.key = key
+        self.how = how
+        self.field = field
+        self.bars: Dict[datetime, Dict[Hashable, Any]] = {}
+        self.event_count = 0
+        self.bar_count = 0
+
+    def __call__(self, _event_time: datetime, value: Any) -> None:
+        self.event_count += 1
+        bar_end = EPOCH + ((engine.now() - EPOCH) // self.interval + 1) * self.interval
+        bar = self.bars.get(bar_end)
+        if bar is None:
+            bar = self.bars[bar_end] = {}
+            engine.call_later(bar_end, self.flush)
+        key = self.key(value) if self.key else None
+        if self.field:
+            value = self.field(value)
+        if key not in bar:
+            bar[key] = OHLC(value, value, value, value) if self.how == "ohlc" else value
+        elif self.how == "last":
+            bar[key] = value
+        elif self.how == "sum":
+            bar[key] += value
+        else:
+            aggregate = bar[key]
+            bar[key] = OHLC(aggregate.open, max(aggregate.high, value), min(aggregate.low, value), value)
+
+    async def flush(self, bar_end: datetime) -> None:
+        bar = self.bars.pop(bar_end)
+        self.bar_count += 1
+        result = self.callback(bar_end, bar if self.key else bar[None])
+        if asyncio.iscoroutine(result):
+            await result
+
+
+def conflate(
+    stream: AsyncIterable[Tuple[datetime, Any]],
+    interval: Union[float, timedelta],
+    callback: Callable,
+    key: Optional[Callable[[Any], Hashable]] = None,
+    how: str = "last",
+    field: Optional[Callable[[Any], Any]] = None,
+    **kwargs: Any,
+) -> Coroutine:
+    """
+    Process a live stream, calling the callback once per interval with the conflated value of its events.
+    :param stream: Asynchronous iterable of (event_time, value) tuples.
+    :param interval: Length of bars, in seconds if a number.
+    :param callback: Function or coroutine function called with the end time and aggregated value of each bar.
+    :param key: Function returning the key of an event value, values of different keys are aggregated separately.
+    :param how: Aggregation of the values of a bar, "last", "sum" or "ohlc".
+    :param field: Function returning the value to aggregate from an event value, the event value itself by default.
+    :param kwargs: Other arguments of process_stream, such as past to conflate past events first.
+    :return: Coroutine to pass to run.
+    """
+    return engine.process_stream(Conflator(callback, interval, key, how, field), future=stream, **kwargs)
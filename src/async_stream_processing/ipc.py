@@ -0,0 +1,205 @@
+import asyncio
+import os
+import select
+import struct
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from .pool import attach
+from .store import from_timestamp, to_timestamp
+
+# header of 64 bit words, counters written by each side are kept on separate cache lines
+WRITE_INDEX = 0
+READ_INDEX = 8
+READER_WAITING = 16
+CLOSED = 17
+RECORD_SIZE = 18
+CAPACITY = 19
+WRITER_WAITING = 20
+HEADER_SIZE = 24 * 8
+
+
+def notify(pipe: int) -> None:
+    try:
+        os.write(pipe, b"\0")
+    except BlockingIOError:
+        pass  # the pipe is full of wake ups already
+
+
+def drain(pipe: int) -> None:
+    try:
+        while os.read(pipe, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class Ring:
+    """
+    Single producer, single consumer ring buffer of fixed size binary records in shared memory, which lets a feed
+    handler pass events to a process running asp.run without sockets or pickling.
+    Records are an event time followed by fields packed with the struct format record_format. The ring is created
+    by whichever side is given a capacity, in records, and attached to by name by the other one. Two named pipes next to
+    it wake up the consumer waiting for records and the producer waiting for a free slot, so that neither side polls.
+    A side flags that it waits before checking the ring again and blocking, and the other side writes to the pipe when
+    it sees the flag after moving its index: a wake up written before the waiting side blocks stays in the pipe, so none
+    is lost. POSIX only.
+    """
+
+    def __init__(self, name: Optional[str], record_format: str, capacity: Optional[int] = None):
+        self.record = struct.Struct("<q" + record_format.lstrip("<=@!>"))
+        self.owner = capacity is not None
+        if capacity is not None:
+            self.shared_memory = SharedMemory(name, create=True, size=HEADER_SIZE + capacity * self.record.size)
+        elif name is None:
+            raise ValueError("The name of the ring to attach to is required.")
+        else:
+            self.shared_memory = attach(name)
+        self.name = self.shared_memory.name.lstrip("/")
+        self.header = self.shared_memory.buf[:HEADER_SIZE].cast("Q")
+        self.records = self.shared_memory.buf[HEADER_SIZE:]
+        self.wake_up_path = os.path.join(tempfile.gettempdir(), f"asp-{self.name}.fifo")
+        self.slot_freed_path = os.path.join(tempfile.gettempdir(), f"asp-{self.name}-slots.fifo")
+        if capacity is not None:
+            self.header[RECORD_SIZE] = self.record.size
+            self.header[CAPACITY] = capacity
+            os.mkfifo(self.wake_up_path)
+            os.mkfifo(self.slot_freed_path)
+        elif self.header[RECORD_SIZE] != self.record.size:
+            self.release()
+            raise ValueError(f"Records of {self.name} are {self.header[RECORD_SIZE]} bytes, not {self.record.size}.")
+        self.capacity = self.header[CAPACITY]
+        # opened for reading and writing so that opening does not wait for the other side
+        self.wake_up = os.open(self.wake_up_path, os.O_RDWR | os.O_NONBLOCK)
+        self.slot_freed = os.open(self.slot_freed_path, os.O_RDWR | os.O_NONBLOCK)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def release(self) -> None:
+        self.header.release()
+        self.records.release()
+        self.shared_memory.close()
+
+    def close(self) -> None:
+        """
+        Detach from the ring, which is also removed by the side which created it.
+        :return: None
+        """
+        os.close(self.wake_up)
+        os.close(self.slot_freed)
+        self.release()
+        if self.owner:
+            self.shared_memory.unlink()
+            os.unlink(self.wake_up_path)
+            os.unlink(self.slot_freed_path)
+
+
+class RingWriter(Ring):
+    """
+    Producer side of a Ring.
+    """
+
+    def __init__(self, name: Optional[str], record_format: str, capacity: Optional[int] = None):
+        super().__init__(name, record_format, capacity)
+        self.write_index = self.header[WRITE_INDEX]
+
+    def write(self, event_time: datetime, *fields: Any, timeout: Optional[float] = None) -> bool:
+        """
+        Append a record to the ring, waiting for the consumer to free a slot if it is full.
+        :param event_time: Time of the event.
+        :param fields: Fields of the record, as per record_format.
+        :param timeout: Maximum time to wait for a free slot, in seconds, forever if None.
+        :return: Whether the record was written.
+        """
+        write_index = self.write_index
+        if write_index - self.header[READ_INDEX] >= self.capacity and not self.wait(write_index, timeout):
+            return False
+        self.record.pack_into(
+            self.records, (write_index % self.capacity) * self.record.size, to_timestamp(event_time), *fields
+        )
+        self.write_index = self.header[WRITE_INDEX] = write_index + 1
+        if self.header[READER_WAITING]:
+            notify(self.wake_up)
+        return True
+
+    def wait(self, write_index: int, timeout: Optional[float]) -> bool:
+        """
+        Block until the consumer frees a slot.
+        :param write_index: Index of the record to write.
+        :param timeout: Maximum time to wait, in seconds, forever if None.
+        :return: Whether a slot was freed in time.
+        """
+        header = self.header
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                header[WRITER_WAITING] = 1
+                if write_index - header[READ_INDEX] < self.capacity:
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                select.select([self.slot_freed], [], [], remaining)
+                drain(self.slot_freed)
+        finally:
+            header[WRITER_WAITING] = 0
+
+    def close(self) -> None:
+        """
+        Mark the end of the stream, the reader stops once it has read all the records, and detach from the ring.
+        :return: None
+        """
+        self.header[CLOSED] = 1
+        notify(self.wake_up)
+        super().close()
+
+
+class RingReader(Ring):
+    """
+    Consumer side of a Ring, an asynchronous iterable of (event_time, fields) tuples to be used as a live source.
+    """
+
+    def __aiter__(self) -> AsyncIterator[Tuple[datetime, Tuple[Any, ...]]]:
+        return self.events()
+
+    async def events(self) -> AsyncIterator[Tuple[datetime, Tuple[Any, ...]]]:
+        header, records, capacity = self.header, self.records, self.capacity
+        unpack_from, record_size = self.record.unpack_from, self.record.size
+        read_index = header[READ_INDEX]
+        while True:
+            write_index = header[WRITE_INDEX]
+            while read_index < write_index:
+                event_time, *fields = unpack_from(records, (read_index % capacity) * record_size)
+                read_index += 1
+                header[READ_INDEX] = read_index
+                if header[WRITER_WAITING]:
+                    notify(self.slot_freed)
+                yield from_timestamp(event_time), tuple(fields)
+            if header[CLOSED] and read_index == header[WRITE_INDEX]:
+                return
+            header[READER_WAITING] = 1
+            if read_index == header[WRITE_INDEX] and not header[CLOSED]:
+                await self.wait()
+            header[READER_WAITING] = 0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+
+        def on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(self.wake_up, on_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(self.wake_up)
+        drain(self.wake_up)
@@ -0,0 +1,198 @@
+import mmap
+import pickle
+import struct
+import time
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from .store import from_timestamp, to_timestamp
+
+RECORD_HEADER = struct.Struct("<qI")  # event time in microseconds since the epoch, payload size
+INDEX_ENTRY = struct.Struct("<qQ")  # event time in microseconds since the epoch, record offset
+SEGMENT_SUFFIX = ".log"
+INDEX_SUFFIX = ".idx"
+
+
+class JournalWriter:
+    """
+    Append events, in event time order, to a journal, ie: a directory of segment files named after the time of their
+    first event.
+    Records are buffered and written once flush_size bytes are pending or flush_interval seconds have elapsed. A new
+    segment is started once the current one exceeds segment_size bytes. Every index_interval records, an entry is
+    added to the segment index so that readers can start from a given time without scanning the whole segment.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        segment_size: int = 64 * 1024 * 1024,
+        flush_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        index_interval: int = 1024,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        self.segment: Optional[BinaryIO] = None
+        self.index: Optional[BinaryIO] = None
+        self.segment_offset = 0
+        self.record_count = 0
+        self.buffer = bytearray()
+        self.index_buffer = bytearray()
+        self.flush_time = time.monotonic()
+
+    def __enter__(self) -> "JournalWriter":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def write(self, event_time: datetime, value: Any) -> None:
+        """
+        Append an event to the journal.
+        :param event_time: Time of the event.
+        :param value: Value of the event, must be picklable.
+        :return: None
+        """
+        timestamp = to_timestamp(event_time)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.segment is None or self.segment_offset >= self.segment_size:
+            self.rotate(timestamp)
+        if self.record_count % self.index_interval == 0:
+            self.index_buffer += INDEX_ENTRY.pack(timestamp, self.segment_offset)
+        self.buffer += RECORD_HEADER.pack(timestamp, len(payload))
+        self.buffer += payload
+        self.segment_offset += RECORD_HEADER.size + len(payload)
+        self.record_count += 1
+        if len(self.buffer) >= self.flush_size or time.monotonic() - self.flush_time >= self.flush_interval:
+            self.flush()
+
+    def rotate(self, timestamp: int) -> None:
+        self.close()
+        name = f"{timestamp:020d}"
+        self.segment = open(self.directory / f"{name}{SEGMENT_SUFFIX}", "ab")
+        self.index = open(self.directory / f"{name}{INDEX_SUFFIX}", "ab")
+        self.segment_offset = self.segment.tell()
+        self.record_count = 0
+
+    def flush(self) -> None:
+        """
+        Write pending records to disk.
+        :return: None
+        """
+        if self.segment is not None and self.index is not None:
+            self.segment.write(self.buffer)
+            self.segment.flush()
+            # index entries are only written once the records they point to are written
+            self.index.write(self.index_buffer)
+            self.index.flush()
+        self.buffer.clear()
+        self.index_buffer.clear()
+        self.flush_time = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Write pending records and close the current segment.
+        :return: None
+        """
+        self.flush()
+        for file in (self.segment, self.index):
+            if file is not None:
+                file.close()
+        self.segment = self.index = None
+
+
+async def tee(
+    source: AsyncIterable[Tuple[datetime, Any]], writer: JournalWriter
+) -> AsyncIterator[Tuple[datetime, Any]]:
+    """
+    Write the events of a live source to a journal as they are processed.
+    """
+    try:
+        async for event_time, value in source:
+            writer.write(event_time, value)
+            yield event_time, value
+    finally:
+        writer.flush()
+
+
+class JournalReader:
+    """
+    Read the events of a journal, optionally within a time range, as a past source. Segments are memory mapped and
+    their index is used to skip records before start_time.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ):
+        self.directory = Path(directory)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.seek_time: Optional[datetime] = None
+
+    def seek(self, timestamp: datetime) -> None:
+        """
+        Start reading from the given time, or from start_time if it is later.
+        :param timestamp: Time of the first event to read.
+        :return: None
+        """
+        self.seek_time = timestamp
+
+    def segments(self) -> List[Tuple[int, Path]]:
+        return sorted((int(path.stem), path) for path in self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def __iter__(self) -> Iterator[Tuple[datetime, Any]]:
+        start_time = self.start_time
+        if self.seek_time is not None:
+            start_time = self.seek_time if start_time is None else max(start_time, self.seek_time)
+        start = to_timestamp(start_time) if start_time else None
+        end = to_timestamp(self.end_time) if self.end_time else None
+        segments = self.segments()
+        first = 0
+        if start is not None:
+            # the last segment starting at or before start_time is the first one which can contain events to read
+            first = max(bisect_right([timestamp for timestamp, _ in segments], start) - 1, 0)
+        for segment_start, path in segments[first:]:
+            if end is not None and segment_start >= end:
+                break
+            for timestamp, value in self.read_segment(path, start, end):
+                yield from_timestamp(timestamp), value
+
+    def read_segment(self, path: Path, start: Optional[int], end: Optional[int]) -> Iterator[Tuple[int, Any]]:
+        with open(path, "rb") as file:
+            size = path.stat().st_size
+            if not size:
+                return
+            with mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as data:
+                offset = self.find_offset(path, start) if start is not None else 0
+                while offset + RECORD_HEADER.size <= size:
+                    timestamp, payload_size = RECORD_HEADER.unpack_from(data, offset)
+                    offset += RECORD_HEADER.size
+                    if offset + payload_size > size:  # truncated record
+                        break
+                    if end is not None and timestamp >= end:
+                        break
+                    if start is None or timestamp >= start:
+                        yield timestamp, pickle.loads(data[offset : offset + payload_size])
+                    offset += payload_size
+
+    def find_offset(self, path: Path, start: int) -> int:
+        """
+        Offset of the last indexed record before start in a segment.
+        """
+        index_path = path.with_suffix(INDEX_SUFFIX)
+        if not index_path.exists():
+            return 0
+        index = index_path.read_bytes()
+        size = len(index) - len(index) % INDEX_ENTRY.size  # ignore a truncated entry
+        entries = [INDEX_ENTRY.unpack_from(index, offset) for offset in range(0, size, INDEX_ENTRY.size)]
+        position = bisect_right([timestamp for timestamp, _ in entries], start - 1) - 1
+        return entries[position][1] if position >= 0 else 0
@@ -0,0 +1,82 @@
+import logging
+import queue
+import sys
+import threading
+from typing import List, Optional, TextIO
+
+from .processor import now
+
+DEFAULT_FORMAT = "%(virtual_time)s %(levelname)s %(name)s %(message)s"
+
+
+class VirtualTimeHandler(logging.Handler):
+    """
+    Logging handler stamping records with the current virtual time and writing them from a background thread.
+    Emitting a record only stamps it and puts it in a bounded queue, records are dropped and counted if the queue is
+    full. The background thread formats and writes queued records in batches. Note that messages are formatted after
+    emit returns, so mutable arguments should not be passed as log arguments.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        capacity: int = 10_000,
+        batch_size: int = 1_000,
+        level: int = logging.NOTSET,
+    ):
+        super().__init__(level)
+        self.stream = stream or sys.stderr
+        self.batch_size = batch_size
+        self.records: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(capacity)
+        self.dropped = 0
+        self.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+        self.writer = threading.Thread(target=self.write_records, name="asp-logging", daemon=True)
+        self.writer.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            record.virtual_time = now()
+        except AttributeError:  # not running
+            record.virtual_time = None
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_records(self) -> None:
+        running = True
+        while running:
+            batch: List[Optional[logging.LogRecord]] = [self.records.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            last_record: Optional[logging.LogRecord] = None
+            for record in batch:
+                if record is None:
+                    running = False
+                    continue
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+                else:
+                    last_record = record
+            if last_record is not None:  # ie: lines were formatted
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    self.handleError(last_record)
+
+    def close(self) -> None:
+        """
+        Write all queued records and stop the background thread.
+        :return: None
+        """
+        if self.writer.is_alive():
+            self.records.put(None)
+            self.writer.join()
+        super().close()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple
+
+from .stats import QuantileSketch, Welford
+
+SPIN = 0.001  # seconds, waits shorter than this busy loop rather than sleep, whose accuracy is around a millisecond
+MAX_SPIN = 0.01  # seconds, the spin blocks the event loop thread
+
+
+class PacingReport(NamedTuple):
+    """
+    Target and achieved speed of a paced replay, and jitter, ie: wall clock lateness of releases of scheduled coroutines
+    compared to when they were due, in seconds.
+    """
+
+    speed: float
+    achieved_speed: float
+    releases: int
+    release_rate: float
+    mean_jitter: float
+    p99_jitter: float
+    max_jitter: float
+
+
+class Pacer:
+    """
+    Pace virtual time against the wall clock at a multiple of real time, so that a coroutine due a given virtual time
+    after the start of a run is released that time divided by speed after its start. Waits use a coarse sleep
+    followed by a short spin for sub millisecond accuracy. The spin busy loops on the event loop thread, so that other
+    tasks, eg: live sources, cannot run during its last spin seconds, which are capped to MAX_SPIN. Wall clock time is
+    read from wall_clock, in seconds, which tests can replace.
+    """
+
+    def __init__(self, speed: float, spin: float = SPIN, wall_clock: Callable[[], float] = time.perf_counter):
+        if speed <= 0:
+            raise ValueError("speed must be positive.")
+        if not 0 <= spin <= MAX_SPIN:
+            raise ValueError(f"spin must be between 0 and {MAX_SPIN} seconds.")
+        self.speed = speed
+        self.spin = spin
+        self.wall_clock = wall_clock
+        self.start_time = datetime.min
+        self.wall_start = 0.0
+        self.last_release = self.wall_start
+        self.last_due_time = self.start_time
+        self.jitter = Welford()
+        self.jitter_quantiles = QuantileSketch()
+        self.max_jitter = 0.0
+
+    def start(self, start_time: datetime) -> None:
+        self.start_time = self.last_due_time = start_time
+        self.wall_start = self.last_release = self.wall_clock()
+
+    def wall_time(self, due_time: datetime) -> float:
+        return self.wall_start + (due_time - self.start_time).total_seconds() / self.speed
+
+    def now(self) -> datetime:
+        return self.start_time + timedelta(seconds=(self.wall_clock() - self.wall_start) * self.speed)
+
+    def release_time(self, due_time: datetime) -> datetime:
+        """
+        :return: Virtual time up to which scheduled coroutines can be released, due_time once it is reached.
+        """
+        wall_time = self.wall_clock()
+        target = self.wall_time(due_time)
+        if wall_time < target:
+            return self.start_time + timedelta(seconds=(wall_time - self.wall_start) * self.speed)
+        if due_time >= self.start_time:
+            jitter = wall_time - target
+            self.jitter.update(jitter)
+            self.jitter_quantiles.update(jitter)
+            self.max_jitter = max(self.max_jitter, jitter)
+            self.last_release, self.last_due_time = wall_time, due_time
+        return due_time
+
+    def delay(self, due_time: datetime) -> float:
+        """
+        :return: Time to sleep, in seconds, before spinning until due_time.
+        """
+        return max(self.wall_time(due_time) - self.wall_clock() - self.spin, 0.0)
+
+    async def sleep(self, due_time: datetime) -> None:
+        """
+        Sleep then busy loop, for at most spin seconds, until due_time.
+        """
+        delay = self.delay(due_time)
+        if delay:
+            await asyncio.sleep(delay)
+        target = self.wall_time(due_time)
+        while self.wall_clock() < target:
+            pass
+
+    def report(self) -> PacingReport:
+        elapsed = self.last_release - self.wall_start
+        virtual_elapsed = (self.last_due_time - self.start_time).total_seconds()
+        return PacingReport(
+            speed=self.speed,
+            achieved_speed=virtual_elapsed / elapsed if elapsed > 0 else float("nan"),
+            releases=self.jitter.count,
+            release_rate=self.jitter.count / elapsed if elapsed > 0 else float("nan"),
+            mean_jitter=self.jitter.mean,
+            p99_jitter=self.jitter_quantiles.quantile(0.99),
+            max_jitter=self.max_jitter,
+        )
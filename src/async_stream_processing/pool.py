@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, AsyncIterable, Callable, Deque, Iterable, Mapping, NamedTuple, Optional, Tuple, cast
+
+from . import processor as engine
+
+SHARED_MEMORY_THRESHOLD = 64 * 1024
+
+
+class SharedPayload(NamedTuple):
+    """
+    Reference to a bytes-like payload copied into shared memory rather than pickled.
+    """
+
+    name: str
+    size: int
+
+
+def attach(name: str) -> SharedMemory:
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+    shared_memory = SharedMemory(name)
+    if os.name == "posix":
+        # the creating process owns the segment, workers should not unlink it when exiting
+        resource_tracker.unregister(shared_memory._name, "shared_memory")  # type: ignore
+    return shared_memory
+
+
+def buffer(shared_memory: SharedMemory) -> memoryview:
+    view = shared_memory.buf
+    if view is None:
+        raise ValueError(f"Shared memory {shared_memory.name} is closed.")
+    return view
+
+
+def call_in_worker(callback: Callable, unpack_args: bool, unpack_kwargs: bool, event_time: datetime, value: Any) -> Any:
+    """
+    Call a stream callback in a worker, shared payloads are passed as memoryviews valid for the duration of the call.
+    """
+    if isinstance(value, SharedPayload):
+        shared_memory = attach(value.name)
+        try:
+            with buffer(shared_memory)[: value.size] as view:
+                return callback(event_time, view)
+        finally:
+            shared_memory.close()
+    if unpack_args:
+        return callback(event_time, *value)
+    elif unpack_kwargs:
+        return callback(event_time, **cast(Mapping[str, Any], value))
+    return callback(event_time, value)
+
+
+class Pipeline:
+    """
+    Submit stream events to an executor, keeping up to max_in_flight of them running, and commit their results in event
+    order. With a process pool, bytes-like values of at least SHARED_MEMORY_THRESHOLD bytes go through shared memory.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        callback: Callable,
+        unpack_args: bool,
+        unpack_kwargs: bool,
+        max_in_flight: int,
+        on_result: Optional[Callable[[datetime, Any], Any]],
+    ):
+        self.executor = executor
+        self.callback = callback
+        self.unpack_args = unpack_args
+        self.unpack_kwargs = unpack_kwargs
+        self.max_in_flight = max_in_flight
+        self.on_result = on_result
+        self.share = isinstance(executor, ProcessPoolExecutor)
+        self.in_flight: Deque[Tuple[datetime, asyncio.Future, Optional[SharedMemory]]] = deque()
+        self.last_event_time: Optional[datetime] = None
+
+    def submit(self, event_time: datetime, value: Any) -> None:
+        shared_memory = None
+        if self.share and isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= SHARED_MEMORY_THRESHOLD:
+            size = memoryview(value).nbytes
+            shared_memory = SharedMemory(create=True, size=size)
+            buffer(shared_memory)[:size] = memoryview(value).cast("B")
+            value = SharedPayload(shared_memory.name, size)
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, call_in_worker, self.callback, self.unpack_args, self.unpack_kwargs, event_time, value
+        )
+        self.in_flight.append((event_time, future, shared_memory))
+
+    async def commit(self, fast_forward: bool) -> None:
+        """
+        Wait for the oldest event in flight, at its event time if fast forwarding, and pass its result to on_result.
+        """
+        event_time, future, shared_memory = self.in_flight.popleft()
+        try:
+            if fast_forward:
+                await engine.sleep(event_time)
+            result = await engine.processor.hold(future)
+        finally:
+            if shared_memory is not None:
+                shared_memory.close()
+                shared_memory.unlink()
+        if self.on_result:
+            self.on_result(event_time, result)
+
+    def close(self) -> None:
+        """
+        Release the shared memory of the events still in flight, eg: once a callback raised.
+        """
+        while self.in_flight:
+            _, future, shared_memory = self.in_flight.popleft()
+            future.cancel()
+            if shared_memory is not None:
+                shared_memory.close()
+                shared_memory.unlink()
+
+    async def process_past(self, past: Iterable[Tuple[datetime, Any]]) -> None:
+        for event_time, value in past:
+            self.last_event_time = event_time
+            self.submit(event_time, value)
+            if len(self.in_flight) >= self.max_in_flight:
+                await self.commit(fast_forward=True)
+
+    async def drain(self, fast_forward: bool) -> None:
+        while self.in_flight:
+            await self.commit(fast_forward)
+
+    async def process_live(self, future: AsyncIterable[Tuple[datetime, Any]]) -> None:
+        iterator = future.__aiter__()
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if len(self.in_flight) >= self.max_in_flight:
+                    await self.commit(fast_forward=False)
+                    continue
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                # commit results as soon as they are available rather than when the next event arrives
+                waiting = [pending, self.in_flight[0][1]] if self.in_flight else [pending]
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                while self.in_flight and self.in_flight[0][1].done():
+                    await self.commit(fast_forward=False)
+                if pending.done():
+                    try:
+                        event_time, value = pending.result()
+                    except StopAsyncIteration:
+                        pending = None
+                        break
+                    pending = None
+                    self.submit(event_time, value)
+        finally:
+            if pending is not None:
+                pending.cancel()
+        await self.drain(fast_forward=False)
@@ -1,16 +1,135 @@
 import asyncio
+import itertools
+from collections import deque
+from concurrent.futures import Executor
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, AsyncIterable, Awaitable, Callable, Coroutine, Dict, Iterable, List, Tuple, Union, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Sized,
+    Set,
+    Tuple,
+    Union,
+    Optional,
+    cast,
+)
+
+if TYPE_CHECKING:
+    from .journal import JournalWriter
+    from .pacing import Pacer, PacingReport
+    from .recorder import Recorder
+    from .spill import SpillStore
 
 
-@dataclass
 class Future:
-    due_time: datetime
+    """
+    Wake up record yielded to the processor to be resumed at a given time. Awaiting it does not allocate anything so a
+    coroutine can reuse the same instance for all its sleeps.
+    """
+
+    __slots__ = ("due_time", "pending")
+
+    def __init__(self, due_time: Optional[datetime] = None):
+        self.due_time = due_time
+        self.pending = False
+
+    def __await__(self) -> Generator[Any, None, None]:
+        self.pending = True
+        return self  # type: ignore
+
+    def __next__(self):
+        if self.pending:
+            self.pending = False
+            return self
+        raise StopIteration
+
+
+class Clock:
+    """
+    Wall clock against which the processor moves virtual time and waits for live events. Tests replace it with a
+    testing.FakeClock so that live streams run in simulated time.
+    """
+
+    now = staticmethod(datetime.now)
+
+    def timer(self, delay: float) -> asyncio.Future:
+        """
+        :param delay: Delay in seconds.
+        :return: Future completed after delay, cancelling it releases the timer.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        handle = loop.call_later(delay, complete, future)
+        future.add_done_callback(lambda _future: handle.cancel())
+        return future
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+    async def sleep_until(self, time: datetime) -> None:
+        await self.sleep((time - self.now()).total_seconds())
+
+    async def wait(self, futures: List[asyncio.Future], timeout: Optional[float]) -> Set[asyncio.Future]:
+        """
+        Wait until one of futures completes or timeout has elapsed, used by the processor only.
+        :param futures: Futures awaited by coroutines, possibly none.
+        :param timeout: Maximum time to wait in seconds, forever if None.
+        :return: Completed futures.
+        """
+        if not futures:
+            await asyncio.sleep(timeout)  # type: ignore
+            return set()
+        done, _pending = await asyncio.wait(futures, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        return done
+
+
+class FrozenClock(Clock):
+    """
+    Clock which does not move, so that virtual time only moves with due times, used by run_scenarios.
+    """
+
+    def __init__(self):
+        self.time = datetime.now()
+
+    def now(self) -> datetime:  # type: ignore
+        return self.time
+
+
+def complete(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
 
-    def __await__(self):
-        yield self
+
+DEFAULT_PRIORITY = "default"
+
+
+class NotSeekable(RuntimeError):
+    """
+    Raised when past sources are required to be moved to the start time of a run and one of them is not seekable.
+    """
+
+
+async def interleave(source: AsyncIterable[Tuple[datetime, Any]]) -> AsyncIterator[Tuple[datetime, Any]]:
+    """
+    Yield to the processor after each event of a live source, so that a burst does not hold back other streams.
+    """
+    wake_up = Future()
+    async for event in source:
+        yield event
+        wake_up.due_time = processor.virtual_time
+        await wake_up
 
 
 def wrap_as_coroutine(func: Callable, event_time: datetime, *args: Any) -> Coroutine:
@@ -20,85 +139,368 @@ def wrap_as_coroutine(func: Callable, event_time: datetime, *args: Any) -> Corou
     return result()
 
 
+def call_coroutine(func: Callable, due_time: datetime, args: Tuple) -> Coroutine:
+    """
+    Coroutine calling a function or coroutine function with its due time and arguments.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return func(due_time, *args)
+    return wrap_as_coroutine(func, due_time, *args)
+
+
 @dataclass
 class Processor:
-    def __init__(self, coroutines: List[Coroutine], start_time: datetime):
+    def __init__(
+        self,
+        coroutines: List[Coroutine],
+        start_time: datetime,
+        seek_time: Optional[datetime] = None,
+        weights: Optional[Dict[str, int]] = None,
+        pacer: Optional["Pacer"] = None,
+        clock: Optional[Clock] = None,
+        spill: Optional["SpillStore"] = None,
+    ):
         self.start_time = start_time
+        self.pacer = pacer
+        self.clock = clock or Clock()
+        self.spill = spill
+        self.require_seek = False
+        self.last_event_time: Optional[datetime] = None
+        # latest time a coroutine or timer was scheduled at, later than last_event_time if any outlived the past events
+        self.latest_due_time = start_time
+        self.seek_time = seek_time
         self.virtual_time = start_time
-        self.actual_time = datetime.now()
+        self.actual_time = self.clock.now()
         self.scheduled_coroutines: List[Tuple[datetime, Coroutine]] = []
         self.ready_coroutines = coroutines.copy()
+        self.holds: List[datetime] = []
+        # priority classes, served in decreasing weight order, empty unless weighted fair scheduling is enabled
+        self.weights: Dict[str, int] = {}
+        if weights:
+            weights = {DEFAULT_PRIORITY: 1, **weights}
+            self.weights = dict(sorted(weights.items(), key=lambda item: -item[1]))
+        self.queues: Dict[str, Deque[Coroutine]] = {name: deque() for name in self.weights}
+        self.max_queue_depths: Dict[str, int] = {name: 0 for name in self.weights}
+        self.queued_count = 0
+        self.priorities: Dict[Coroutine, str] = {}
+        self.current: Optional[Coroutine] = None
+        self.current_priority = DEFAULT_PRIORITY
 
     @contextmanager
     def update_virtual_time(self):
-        self.actual_time = datetime.now()
+        self.actual_time = self.clock.now()
         yield
-        self.virtual_time += datetime.now() - self.actual_time
+        self.virtual_time += self.clock.now() - self.actual_time
 
     def now(self) -> datetime:
-        return self.virtual_time + (datetime.now() - self.actual_time)
+        return self.virtual_time + (self.clock.now() - self.actual_time)
+
+    async def hold(self, awaitable: Awaitable) -> Any:
+        """
+        Await an awaitable while holding virtual time at its current value, ie: scheduled coroutines due later are not
+        resumed until it completes, so that results are consistent with a synchronous call.
+        :param awaitable: Awaitable to wait for.
+        :return: Result of the awaitable.
+        """
+        hold = self.virtual_time
+        self.holds.append(hold)
+        try:
+            return await awaitable
+        finally:
+            self.holds.remove(hold)
+
+    async def offload(self, executor: Executor, func: Callable, *args: Any) -> Any:
+        """
+        Run a blocking function in an executor, holding virtual time until it returns.
+        :param executor: Executor to run the function in.
+        :param func: Function to call.
+        :param args: Arguments to pass to the function.
+        :return: Value returned by the function.
+        """
+        return await self.hold(asyncio.get_running_loop().run_in_executor(executor, func, *args))
+
+    def replayed(self, event_time: Optional[datetime]) -> None:
+        """
+        Record the time of the last past event of a stream, see last_event_time.
+        """
+        if event_time is not None and (self.last_event_time is None or event_time > self.last_event_time):
+            self.last_event_time = event_time
+
+    def set_priority(self, priority: str) -> None:
+        """
+        Set the priority class of the calling coroutine, coroutines it schedules or spawns then inherit it. Does nothing
+        unless the processor was given weights.
+        :param priority: Name of a priority class given in the weights of run.
+        :return: None
+        """
+        if not self.weights:
+            return
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class {priority!r}.")
+        self.priorities[self.current] = self.current_priority = priority  # type: ignore
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        :return: Number of coroutines ready to run for each priority class, see max_queue_depths for the highest ones.
+        """
+        return {name: len(queue) for name, queue in self.queues.items()}
+
+    def spawn(self, coroutine: Coroutine) -> asyncio.Future:
+        """
+        Run a coroutine concurrently with the calling one.
+        :param coroutine: Coroutine to run.
+        :return: Future completed with the result of the coroutine, cancelling it closes the coroutine.
+        """
+        result = asyncio.get_running_loop().create_future()
+        awaited: List[Any] = [None]
+
+        def complete() -> Generator[Any, None, None]:
+            # steps the coroutine rather than awaiting it, so that it can be closed while suspended
+            while not result.done():
+                try:
+                    awaited[0] = coroutine.send(None)
+                except StopIteration as stop:
+                    result.set_result(stop.value)
+                    return
+                except Exception as exception:
+                    result.set_exception(exception)
+                    return
+                yield awaited[0]
+
+        def cancel(_result: asyncio.Future) -> None:
+            if result.cancelled():
+                coroutine.close()
+                if isinstance(awaited[0], asyncio.Future):
+                    # resumes complete, which then returns
+                    awaited[0].cancel()
+
+        result.add_done_callback(cancel)
+        # resumed by the processor like a coroutine
+        spawned = cast(Coroutine, complete())
+        if self.weights:
+            self.priorities[spawned] = self.current_priority
+        self.ready_coroutines.append(spawned)
+        return result
 
     def call_later(
-        self, delay: Union[float, timedelta, datetime, None], coroutine_or_func: Union[Coroutine, Callable], *args: Any
+        self,
+        delay: Union[float, timedelta, datetime, None],
+        coroutine_or_func: Union[Coroutine, Callable],
+        *args: Any,
+        executor: Optional[Executor] = None,
     ) -> None:
         """
         Call a function after a delay.
         :param delay: Delay in seconds.
         :param func: Function to call.
         :param args: Arguments to pass to the function.
+        :param executor: Executor to run the function in, see offload.
         :return: None
         """
         if isinstance(delay, timedelta):
-            delay = self.now() + delay
+            due_time = self.now() + delay
         elif isinstance(delay, (float, int)):
-            delay = self.now() + timedelta(seconds=delay)
+            due_time = self.now() + timedelta(seconds=delay)
         elif delay is None:
-            delay = self.now()
-        if asyncio.iscoroutinefunction(coroutine_or_func):
-            coroutine_or_func = coroutine_or_func(delay, *args)
-        elif not asyncio.iscoroutine(coroutine_or_func):
-            coroutine_or_func = wrap_as_coroutine(coroutine_or_func, delay, *args)  # type: ignore
-        self.scheduled_coroutines.append((delay, coroutine_or_func))
-        self.scheduled_coroutines.sort(key=lambda x: x[0])
+            due_time = self.now()
+        else:
+            due_time = delay
+        if executor is not None:
+            if not callable(coroutine_or_func) or asyncio.iscoroutinefunction(coroutine_or_func):
+                raise ValueError("Only regular functions can be run in an executor.")
+            coroutine = self.offload(executor, coroutine_or_func, due_time, *args)
+        elif asyncio.iscoroutine(coroutine_or_func):
+            coroutine = coroutine_or_func
+        elif self.spill is not None and self.spill.add(
+            due_time, self.virtual_time, cast(Callable, coroutine_or_func), args, self.current_priority
+        ):
+            return
+        else:
+            coroutine = call_coroutine(coroutine_or_func, due_time, args)  # type: ignore
+        if self.weights:
+            self.priorities[coroutine] = self.current_priority
+        self.schedule(due_time, coroutine)
+
+    def load_spilled(self) -> None:
+        """
+        Schedule the spilled timers of the next buckets until the next scheduled coroutine is due before them.
+        """
+        spill: "SpillStore" = self.spill  # type: ignore
+        scheduled_coroutines = self.scheduled_coroutines
+        while spill.buckets and (not scheduled_coroutines or scheduled_coroutines[0][0] >= spill.loaded_until):
+            for due_time, func, args, priority in spill.load_next():
+                coroutine = call_coroutine(func, due_time, args)
+                if self.weights:
+                    self.priorities[coroutine] = priority
+                self.schedule(due_time, coroutine)
+
+    def schedule(self, due_time: datetime, coroutine: Coroutine) -> None:
+        """
+        Insert a coroutine in the scheduled coroutines, after the ones due at the same time. Due times mostly come in
+        increasing order, so the insertion point is searched from the end.
+        """
+        if due_time > self.latest_due_time:
+            self.latest_due_time = due_time
+        scheduled_coroutines = self.scheduled_coroutines
+        index = len(scheduled_coroutines)
+        while index and scheduled_coroutines[index - 1][0] > due_time:
+            index -= 1
+        scheduled_coroutines.insert(index, (due_time, coroutine))
 
     async def run(self) -> None:
-        awaiting_coroutines: Dict[asyncio.Task, Coroutine] = {}
+        awaiting_coroutines: Dict[asyncio.Future, Coroutine] = {}
+        clock = self.clock
+        clock_now = clock.now
         self.virtual_time = self.start_time
-        while awaiting_coroutines or self.scheduled_coroutines or self.ready_coroutines:
+        if self.pacer is not None:
+            self.pacer.start(self.start_time)
+        while (
+            awaiting_coroutines
+            or self.scheduled_coroutines
+            or self.ready_coroutines
+            or self.queued_count
+            or (self.spill is not None and len(self.spill) > 0)
+        ):
+            if self.spill is not None:
+                self.load_spilled()
             next_due_time = self.scheduled_coroutines[0][0] if self.scheduled_coroutines else None
+            if next_due_time and self.holds and next_due_time > min(self.holds):
+                # held until offloaded functions return
+                next_due_time = None
+            elif next_due_time and self.queued_count:
+                # weights only reorder coroutines which are already due, virtual time moves once they are all resumed
+                next_due_time = None
             if next_due_time:
+                if self.pacer is not None:
+                    self.virtual_time = max(self.virtual_time, self.pacer.release_time(next_due_time))
                 # move virtual time forward if in the past
-                if next_due_time and next_due_time < datetime.now():
+                elif next_due_time < clock_now():
                     self.virtual_time = max(self.virtual_time, next_due_time)
                 else:
-                    self.virtual_time = datetime.now()
-            while self.scheduled_coroutines and self.scheduled_coroutines[0][0] <= self.virtual_time:
+                    self.virtual_time = clock_now()
+            release_time = min(self.virtual_time, *self.holds) if self.holds else self.virtual_time
+            while self.scheduled_coroutines and self.scheduled_coroutines[0][0] <= release_time:
                 self.ready_coroutines.append(self.scheduled_coroutines.pop(0)[1])
-            if not self.ready_coroutines:
+            if not self.ready_coroutines and not self.queued_count and self.pacer is not None:
+                await self.wait_paced(next_due_time, awaiting_coroutines)
+            elif not self.ready_coroutines and not self.queued_count:
                 with self.update_virtual_time():
-                    if awaiting_coroutines:
-                        timeout = (next_due_time - datetime.now()).total_seconds() if next_due_time else None
-                        done, _pending = await asyncio.wait(
-                            list(awaiting_coroutines), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
-                        )
-                        for future in done:
+                    if awaiting_coroutines or next_due_time:
+                        timeout = (next_due_time - clock_now()).total_seconds() if next_due_time else None
+                        for future in await clock.wait(list(awaiting_coroutines), timeout):
                             self.ready_coroutines.append(awaiting_coroutines.pop(future))
-                    elif next_due_time:
-                        await asyncio.sleep((next_due_time - datetime.now()).total_seconds())
-            for coroutine in self.ready_coroutines:
+            elif self.weights and awaiting_coroutines:
+                # collect live events without waiting, so that coroutines queued behind a burst do not delay them
                 with self.update_virtual_time():
-                    try:
-                        result = coroutine.send(None)
-                    except StopIteration:
-                        continue
+                    await asyncio.sleep(0)
+                for future in [future for future in awaiting_coroutines if future.done()]:
+                    self.ready_coroutines.append(awaiting_coroutines.pop(future))
+            if self.weights:
+                self.resume_weighted(awaiting_coroutines)
+                continue
+            for coroutine in self.ready_coroutines:
+                # same as update_virtual_time, inlined as this runs for every event
+                self.actual_time = clock_now()
+                try:
+                    result = coroutine.send(None)
+                except StopIteration:
+                    continue
+                else:
+                    if isinstance(result, Future):
+                        self.schedule(result.due_time, coroutine)  # type: ignore
                     else:
-                        if isinstance(result, Future):
-                            self.scheduled_coroutines.append((result.due_time, coroutine))
-                            self.scheduled_coroutines.sort(key=lambda x: x[0])
-                        else:
-                            awaiting_coroutines[result] = coroutine
+                        awaiting_coroutines[result] = coroutine
+                finally:
+                    self.virtual_time += clock_now() - self.actual_time
             self.ready_coroutines.clear()
 
+    def advance(self, until: Optional[datetime]) -> None:
+        """
+        Synchronously resume ready coroutines and scheduled ones due up to until, all of them if until is None, moving
+        virtual time to their due times only. Coroutines can sleep but not await anything else.
+        """
+        scheduled_coroutines = self.scheduled_coroutines
+        while self.ready_coroutines or (
+            scheduled_coroutines and (until is None or scheduled_coroutines[0][0] <= until)
+        ):
+            if not self.ready_coroutines:
+                due_time, coroutine = scheduled_coroutines.pop(0)
+                self.virtual_time = max(self.virtual_time, due_time)
+                self.ready_coroutines.append(coroutine)
+            for coroutine in self.ready_coroutines:
+                self.actual_time = self.clock.now()
+                try:
+                    result = coroutine.send(None)
+                except StopIteration:
+                    continue
+                if not isinstance(result, Future):
+                    coroutine.close()
+                    raise RuntimeError("Scenario coroutines can only await asp.sleep.")
+                self.schedule(result.due_time, coroutine)  # type: ignore
+            self.ready_coroutines.clear()
+        if until is not None:
+            self.virtual_time = max(self.virtual_time, until)
+        self.actual_time = self.clock.now()
+
+    async def wait_paced(
+        self, next_due_time: Optional[datetime], awaiting_coroutines: Dict[asyncio.Future, Coroutine]
+    ) -> None:
+        """
+        Wait until the next scheduled coroutine is due as per the pacer, or an awaited future completes.
+        """
+        pacer: "Pacer" = self.pacer  # type: ignore
+        if awaiting_coroutines:
+            timeout = pacer.delay(next_due_time) if next_due_time else None
+            done, _pending = await asyncio.wait(
+                list(awaiting_coroutines), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                self.ready_coroutines.append(awaiting_coroutines.pop(future))
+        elif next_due_time:
+            await pacer.sleep(next_due_time)
+        if next_due_time is None:
+            self.virtual_time = max(self.virtual_time, pacer.now())
+
+    def resume_weighted(self, awaiting_coroutines: Dict[asyncio.Future, Coroutine]) -> None:
+        """
+        Queue ready coroutines by priority class, then resume up to weight coroutines of each class, in decreasing
+        weight order. Coroutines yielding a wake up record which is already due are queued again rather than scheduled.
+        """
+        queues = self.queues
+        clock_now = self.clock.now
+        for coroutine in self.ready_coroutines:
+            queues[self.priorities.get(coroutine, DEFAULT_PRIORITY)].append(coroutine)
+        self.queued_count += len(self.ready_coroutines)
+        self.ready_coroutines.clear()
+        for name, queue in queues.items():
+            if len(queue) > self.max_queue_depths[name]:
+                self.max_queue_depths[name] = len(queue)
+        for name, weight in self.weights.items():
+            queue = queues[name]
+            for _ in range(min(weight, len(queue))):
+                coroutine = queue.popleft()
+                self.queued_count -= 1
+                self.current = coroutine
+                self.current_priority = name
+                self.actual_time = clock_now()
+                try:
+                    result = coroutine.send(None)
+                except StopIteration:
+                    self.priorities.pop(coroutine, None)
+                else:
+                    if isinstance(result, Future):
+                        due_time = result.due_time
+                        if due_time is not None and due_time <= self.virtual_time and not self.holds:
+                            self.ready_coroutines.append(coroutine)
+                        else:
+                            self.schedule(due_time, coroutine)  # type: ignore
+                    else:
+                        awaiting_coroutines[result] = coroutine
+                finally:
+                    self.virtual_time += clock_now() - self.actual_time
+        self.current = None
+        self.current_priority = DEFAULT_PRIORITY
+
 
 processor: Processor = None  # type: ignore
 
@@ -124,17 +526,37 @@ def now() -> datetime:
     return processor.now()
 
 
+def queue_depths() -> Dict[str, int]:
+    """
+    Get the number of coroutines ready to run for each priority class.
+    :return: Dictionary of queue depths by priority class, empty unless run was given weights.
+    """
+    return processor.queue_depths()
+
+
+def pacing_report() -> Optional["PacingReport"]:
+    """
+    Get the target and achieved speed and the jitter of the last paced run.
+    :return: Report of the pacing, None unless run was given a speed.
+    """
+    return processor.pacer.report() if processor.pacer is not None else None
+
+
 def call_later(
-    delay: Union[float, timedelta, datetime, None], coroutine_or_func: Union[Coroutine, Callable], *args: Any
+    delay: Union[float, timedelta, datetime, None],
+    coroutine_or_func: Union[Coroutine, Callable],
+    *args: Any,
+    executor: Optional[Executor] = None,
 ) -> None:
     """
     Call a function after a delay.
     :param delay: Delay in seconds.
     :param func: Function to call.
     :param args: Arguments to pass to the function.
+    :param executor: Executor to run the function in, virtual time is held until it returns.
     :return: None
     """
-    processor.call_later(delay, coroutine_or_func, *args)
+    processor.call_later(delay, coroutine_or_func, *args, executor=executor)
 
 
 async def timer(
@@ -155,52 +577,401 @@ def call_method(
     unpack_args,
     unpack_kwargs,
 ) -> Callable:
-    def result(event_time, value):
-        if unpack_args:
+    """
+    Specialise the call of a callback once rather than checking how to pass values for every event.
+    """
+    if unpack_args:
+
+        def result(event_time, value):
             return callback(event_time, *value)
-        elif unpack_kwargs:
+
+    elif unpack_kwargs:
+
+        def result(event_time, value):
             return callback(event_time, **value)
-        else:
-            return callback(event_time, value)
 
+    else:
+        return callback
     return result
 
 
+async def process_concurrently(
+    source: AsyncIterable[Tuple[datetime, Any]],
+    callback: Callable[[datetime, Any], Coroutine],
+    max_in_flight: int,
+    preserve_order: bool,
+    on_result: Optional[Callable[[datetime, Any], Any]],
+) -> None:
+    """
+    Process live events with up to max_in_flight callback coroutines running at once, passing their results to
+    on_result in event order if preserve_order is set, as they complete otherwise. Once a callback raises, those still
+    running are cancelled.
+    """
+    in_flight: Deque[Tuple[datetime, asyncio.Future]] = deque()
+
+    def commit() -> None:
+        if preserve_order:
+            while in_flight and in_flight[0][1].done():
+                event_time, done = in_flight.popleft()
+                result = done.result()
+                if on_result:
+                    on_result(event_time, result)
+        else:
+            for event in [event for event in in_flight if event[1].done()]:
+                in_flight.remove(event)
+                result = event[1].result()
+                if on_result:
+                    on_result(event[0], result)
+
+    iterator = source.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None and len(in_flight) < max_in_flight:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            # results completed out of order are not waited for again, which would busy loop until they are committed
+            waiting = [callback_result for _, callback_result in in_flight if not callback_result.done()]
+            if pending is not None:
+                waiting.append(pending)
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            commit()
+            if pending is not None and pending.done():
+                try:
+                    event_time, value = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    break
+                pending = None
+                in_flight.append((event_time, processor.spawn(callback(event_time, value))))
+        while in_flight:
+            await asyncio.wait(
+                [callback_result for _, callback_result in in_flight if not callback_result.done()],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            commit()
+    finally:
+        if pending is not None:
+            pending.cancel()
+        for _, callback_result in in_flight:
+            callback_result.cancel()
+
+
 async def process_stream(
-    callback: Union[Callable[..., None], Callable[..., Awaitable]],
-    past: Iterable[Tuple[datetime, Any]] = [],
+    callback: Callable[..., Any],
+    past: Union[Iterable[Tuple[datetime, Any]], AsyncIterable[Tuple[datetime, Any]]] = [],
     future: Optional[AsyncIterable] = None,
     on_start: Optional[Callable[[], None]] = None,
     on_live_start: Optional[Callable[[], None]] = None,
     unpack_args: bool = False,
     unpack_kwargs: bool = False,
+    max_lateness: Union[float, timedelta, None] = None,
+    on_late: Optional[Callable[[datetime, Any], None]] = None,
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 1,
+    on_result: Optional[Callable[[datetime, Any], Any]] = None,
+    preserve_order: bool = True,
+    priority: Optional[str] = None,
+    capture: Optional["JournalWriter"] = None,
 ):
-    wrapped_callback = call_method(callback, unpack_args, unpack_kwargs)
-    if not asyncio.iscoroutinefunction(callback):
+    """
+    Process a stream of timestamped events, past events first then live ones.
+    :param callback: Function or coroutine function called with the event time and value of each event.
+    :param past: Iterable of (event_time, value) tuples processed in accelerated virtual time. It can also be an
+        asynchronous iterable, which is then fetched in batches concurrently with processing. Seekable sources are
+        moved to the start time given to run, if any, skipping the events before it.
+    :param future: Asynchronous iterable of (event_time, value) tuples processed as they arrive.
+    :param on_start: Called before the first past event.
+    :param on_live_start: Called once all past events have been processed.
+    :param unpack_args: Pass values as positional arguments.
+    :param unpack_kwargs: Pass values as keyword arguments.
+    :param max_lateness: If set, live events are reordered by event time, allowing them to arrive up to this delay late.
+    :param on_late: Called with events arriving later than max_lateness, which are otherwise dropped.
+    :param executor: Executor to run the callback in. Virtual time is held until it returns.
+    :param max_in_flight: Number of events submitted to the executor ahead of time. Results are still committed in
+        event order, at their event time when fast forwarding, but callbacks run ahead of virtual time so should not
+        have side effects other than their result. Without an executor, up to max_in_flight coroutine callbacks are
+        run at once for live events, past events are still processed one at a time.
+    :param on_result: Called with the event time and result of callbacks run in an executor or concurrently.
+    :param preserve_order: Pass results of concurrent coroutine callbacks to on_result in event order rather than as
+        they complete.
+    :param priority: Priority class of the stream, see the weights of run.
+    :param capture: Journal to write live events to, so that they can be replayed later with a JournalReader.
+    :return: None
+    """
+    if priority is not None:
+        processor.set_priority(priority)
+    if processor.seek_time is not None and not seek(past, processor.seek_time) and processor.require_seek:
+        if not isinstance(past, Sized) or len(past):
+            raise NotSeekable(f"{past!r} cannot be moved to {processor.seek_time}.")
+    if future and max_lateness is not None:
+        from .sources import ReorderBuffer
+
+        future = ReorderBuffer(future, max_lateness, on_late)
+    if future and capture is not None:
+        from .journal import tee
+
+        future = tee(future, capture)
+    wrapped_callback: Callable[..., Any] = call_method(callback, unpack_args, unpack_kwargs)
+    if executor is not None:
+        if asyncio.iscoroutinefunction(callback):
+            raise ValueError("Only regular functions can be run in an executor.")
+        if max_in_flight > 1:
+            from .pool import Pipeline
+
+            pipeline = Pipeline(executor, callback, unpack_args, unpack_kwargs, max_in_flight, on_result)
+            try:
+                if on_start:
+                    on_start()
+                if isinstance(past, AsyncIterable):
+                    from .sources import fetch_batches
+
+                    async for batch in fetch_batches(past):
+                        await pipeline.process_past(batch)
+                else:
+                    await pipeline.process_past(past)
+                processor.replayed(pipeline.last_event_time)
+                await pipeline.drain(fast_forward=True)
+                if on_live_start:
+                    on_live_start()
+                if future:
+                    await pipeline.process_live(future)
+            finally:
+                pipeline.close()
+            return
         original_callback = wrapped_callback
 
-        async def wrapped_callback(event_time, value):
-            original_callback(event_time, value)
+        async def offloaded_callback(event_time: datetime, value: Any) -> None:
+            result = await processor.offload(executor, original_callback, event_time, value)
+            if on_result:
+                on_result(event_time, result)
+
+        wrapped_callback = offloaded_callback
+
+    # a single wake up record is reused for all past events
+    wake_up = Future()
+    if executor is not None or asyncio.iscoroutinefunction(callback):
+
+        async def replay(events: Iterable[Tuple[datetime, Any]]) -> None:
+            for event_time, value in events:
+                wake_up.due_time = event_time
+                await wake_up
+                await wrapped_callback(event_time, value)
+
+    else:
+        # regular callbacks are called directly without creating a coroutine
+        async def replay(events: Iterable[Tuple[datetime, Any]]) -> None:
+            for event_time, value in events:
+                wake_up.due_time = event_time
+                await wake_up
+                wrapped_callback(event_time, value)
 
     if on_start:
         on_start()
-    for event_time, value in past:
-        await sleep(event_time)
-        await wrapped_callback(event_time, value)
+    if isinstance(past, AsyncIterable):
+        from .sources import fetch_batches
+
+        async for batch in fetch_batches(past):
+            await replay(batch)
+    else:
+        await replay(past)
+    processor.replayed(wake_up.due_time)
     if on_live_start:
         on_live_start()
     if future:
-        async for event_time, value in future:
-            await wrapped_callback(event_time, value)
+        if executor is None and max_in_flight > 1 and asyncio.iscoroutinefunction(callback):
+            await process_concurrently(future, wrapped_callback, max_in_flight, preserve_order, on_result)
+            return
+        if processor.weights:
+            future = interleave(future)
+        if executor is not None or asyncio.iscoroutinefunction(callback):
+            async for event_time, value in future:
+                await wrapped_callback(event_time, value)
+        else:
+            async for event_time, value in future:
+                wrapped_callback(event_time, value)
+
+
+def broadcast(
+    source: Union[Iterable[Tuple[datetime, Any]], AsyncIterable[Tuple[datetime, Any]]],
+    callbacks: Iterable[Union[Callable[..., None], Callable[..., Awaitable]]],
+    unpack_args: bool = False,
+    unpack_kwargs: bool = False,
+    **kwargs: Any,
+) -> Coroutine:
+    """
+    Process a past source once, passing each event to every callback, in the given order and at the same virtual time.
+    Unlike giving each consumer its own copy or itertools.tee of the source, nothing is stored beyond the current event.
+    :param source: Past source, see process_stream.
+    :param callbacks: Functions or coroutine functions called with the event time and value of each event.
+    :param unpack_args: Pass values as positional arguments.
+    :param unpack_kwargs: Pass values as keyword arguments.
+    :param kwargs: Other arguments of process_stream, such as future for live events.
+    :return: Coroutine to pass to run.
+    """
+    subscribers = [
+        (call_method(callback, unpack_args, unpack_kwargs), asyncio.iscoroutinefunction(callback))
+        for callback in callbacks
+    ]
+    functions = [callback for callback, _ in subscribers]
+
+    async def dispatch_awaiting(event_time: datetime, value: Any) -> None:
+        for callback, is_coroutine_function in subscribers:
+            if is_coroutine_function:
+                await callback(event_time, value)
+            else:
+                callback(event_time, value)
+
+    def dispatch(event_time: datetime, value: Any) -> None:
+        for callback in functions:
+            callback(event_time, value)
 
+    if any(is_coroutine_function for _, is_coroutine_function in subscribers):
+        return process_stream(dispatch_awaiting, past=source, **kwargs)
+    return process_stream(dispatch, past=source, **kwargs)
 
-async def run(coroutines: List[Coroutine[Any, Any, Any]], start_time: Optional[datetime] = None) -> None:
+
+async def run_scenarios(
+    sources: Union[Iterable[Tuple[datetime, Any]], Dict[str, Iterable[Tuple[datetime, Any]]]],
+    scenarios: Iterable[Union[Callable[..., None], Callable[..., Awaitable]]],
+    start_time: Optional[datetime] = None,
+    unpack_args: bool = False,
+    unpack_kwargs: bool = False,
+) -> None:
+    """
+    Run variants of a strategy over the same past events in lockstep, iterating over the events once and passing each
+    of them to every scenario in turn. Each scenario has its own processor, ie: virtual time and scheduled coroutines,
+    so that now, sleep and call_later behave as if it was run on its own. Virtual time only moves with due times, and
+    scenario coroutines can sleep but not await anything else.
+    :param sources: Past source, or past sources by name to merge in event time order, values then being passed as
+        (name, value) tuples.
+    :param scenarios: Functions or coroutine functions called with the event time and value of each event, typically
+        the same method of separate strategy instances.
+    :param start_time: Start time of the scenarios, seekable sources are moved to it, the first event time otherwise.
+    :param unpack_args: Pass values as positional arguments.
+    :param unpack_kwargs: Pass values as keyword arguments.
+    :return: None
+    """
+    global processor
+    if isinstance(sources, dict):
+        import heapq
+
+        from .store import label
+
+        named_sources = cast(Dict[str, Iterable[Tuple[datetime, Any]]], sources)
+        if start_time is not None:
+            for source in named_sources.values():
+                seek(source, start_time)
+        events: Iterable[Tuple[datetime, Any]] = heapq.merge(
+            *(label(name, source) for name, source in named_sources.items()), key=lambda event: event[0]
+        )
+    else:
+        if start_time is not None:
+            seek(sources, start_time)
+        events = sources
+    iterator = iter(events)
+    first = next(iterator, None)
+    if first is None:
+        return
+    scenario_start_time = start_time or first[0]
+    runs = [
+        (
+            Processor([], scenario_start_time, clock=FrozenClock()),
+            call_method(callback, unpack_args, unpack_kwargs),
+            asyncio.iscoroutinefunction(callback),
+        )
+        for callback in scenarios
+    ]
+    previous = processor
+    try:
+        for event_time, value in itertools.chain([first], iterator):
+            for processor, callback, is_coroutine_function in runs:
+                if processor.ready_coroutines or (
+                    processor.scheduled_coroutines and processor.scheduled_coroutines[0][0] <= event_time
+                ):
+                    processor.advance(event_time)
+                processor.virtual_time = event_time
+                processor.actual_time = processor.clock.now()
+                if is_coroutine_function:
+                    processor.ready_coroutines.append(callback(event_time, value))
+                    processor.advance(event_time)
+                else:
+                    callback(event_time, value)
+        for processor, _, _ in runs:
+            processor.advance(None)
+    finally:
+        processor = previous
+
+
+def seek(source: Any, timestamp: datetime) -> bool:
+    """
+    :return: Whether the source is seekable, and was moved to timestamp. Wrappers of sources, eg: Prefetch, raise
+        NotSeekable from seek when the source they wrap is not seekable.
+    """
+    from .sources import Seekable
+
+    if isinstance(source, Seekable):
+        try:
+            source.seek(timestamp)
+        except NotSeekable:
+            return False
+        return True
+    return False
+
+
+async def run(
+    coroutines: List[Coroutine[Any, Any, Any]],
+    start_time: Optional[datetime] = None,
+    recorders: Iterable["Recorder"] = (),
+    weights: Optional[Dict[str, int]] = None,
+    speed: Optional[float] = None,
+    clock: Optional[Clock] = None,
+    spill: Optional["SpillStore"] = None,
+    require_seek: bool = False,
+) -> None:
     """
     Run the processor with the given coroutines.
     :param coroutines: List of coroutines to run.
-    :param start_time: Start time for the processor.
+    :param start_time: Start time for the processor, seekable past sources are moved to it.
+    :param recorders: Recorders to close, ie: write to disk, once the processor has completed.
+    :param weights: Weights of priority classes, see the priority of process_stream. Ready coroutines are then resumed
+        class by class in decreasing weight order, each class resuming at most its weight of coroutines before the
+        next class, and live streams yield between events so that a burst on one stream does not delay the others.
+        Coroutines without a class belong to the "default" class, of weight 1 unless given.
+    :param speed: If set, virtual time is paced at this multiple of real time rather than fast forwarded, eg: to replay
+        recorded traffic into other systems at a given rate. See pacing_report for the achieved rate and jitter.
+    :param clock: Clock to use instead of the wall clock, eg: a testing.FakeClock to run live streams in simulated time.
+        Cannot be combined with speed.
+    :param spill: Store to spill timers armed far in the future into, so that memory usage does not grow with their
+        number. It is not closed by the run, which only drops the timers left spilled if it raises.
+    :param require_seek: Raise NotSeekable when a past source cannot be moved to start_time, rather than replaying it
+        from its beginning.
     :return: None
     """
     global processor
-    processor = Processor(coroutines, start_time or datetime.now())
-    return await processor.run()
+    if spill is not None and spill.closed:
+        raise ValueError("spill is closed.")
+    pacer = None
+    if speed is not None:
+        if clock is not None:
+            raise ValueError("speed and clock cannot be combined.")
+        from .pacing import Pacer
+
+        pacer = Pacer(speed)
+    clock = clock or Clock()
+    processor = Processor(
+        coroutines,
+        start_time or clock.now(),
+        seek_time=start_time,
+        weights=weights,
+        pacer=pacer,
+        clock=clock,
+        spill=spill,
+    )
+    processor.require_seek = require_seek
+    try:
+        return await processor.run()
+    finally:
+        for recorder in recorders:
+            recorder.close()
+        if spill is not None:
+            spill.clear()
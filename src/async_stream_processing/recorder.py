@@ -0,0 +1,163 @@
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .processor import now
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+TIME_COLUMN = "virtual_time"
+OBJECT = "O"
+
+ARROW_TYPES = {
+    "b": "int8",
+    "B": "uint8",
+    "h": "int16",
+    "H": "uint16",
+    "i": "int32",
+    "I": "uint32",
+    "q": "int64",
+    "Q": "uint64",
+    "f": "float32",
+    "d": "float64",
+}
+
+
+class Recorder:
+    """
+    Record rows of fields stamped with the current virtual time into typed columns.
+    Columns are given as a mapping from names to array module type codes, eg: "d" for floats or "q" for integers, or
+    "O" for arbitrary python objects. Rows are written to path, either a .npz (requires numpy) or a .parquet (requires
+    pyarrow) file, when the recorder is closed, which asp.run does for the recorders passed to it. If chunk_size is
+    given, rows are written every chunk_size rows to numbered files next to path instead.
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Dict[str, str], chunk_size: Optional[int] = None):
+        self.path = Path(path)
+        if self.path.suffix not in (".npz", ".parquet"):
+            raise ValueError(f"Unsupported file format {self.path.suffix!r}, expected .npz or .parquet.")
+        if TIME_COLUMN in columns:
+            raise ValueError(f"{TIME_COLUMN!r} is a reserved column name.")
+        for name, type_code in columns.items():
+            if type_code != OBJECT and type_code not in ARROW_TYPES:
+                raise ValueError(f"Unsupported type code {type_code!r} for column {name!r}.")
+        self.types = {TIME_COLUMN: "q", **columns}
+        self.chunk_size = chunk_size
+        self.chunk_count = 0
+        self.row_count = 0
+        self.columns: Dict[str, Union[array, List[Any]]] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.columns = {name: [] if type_code == OBJECT else array(type_code) for name, type_code in self.types.items()}
+        self.bind()
+
+    def bind(self) -> None:
+        self.times = self.columns[TIME_COLUMN].append
+        self.appends = [column.append for name, column in self.columns.items() if name != TIME_COLUMN]
+
+    def __len__(self) -> int:
+        return len(self.columns[TIME_COLUMN])
+
+    def record(self, *fields: Any) -> None:
+        """
+        Append a row stamped with the current virtual time.
+        :param fields: One value per column, in the order the columns were declared.
+        :return: None
+        """
+        if len(fields) != len(self.appends):
+            raise ValueError(f"Expected {len(self.appends)} fields, one per column, got {len(fields)}.")
+        self.times((now() - EPOCH) // MICROSECOND)
+        try:
+            for append, value in zip(self.appends, fields):
+                append(value)
+        except Exception:
+            # remove the partial row, eg: a value of the wrong type, so that columns keep the same length
+            length = len(self)
+            for column in self.columns.values():
+                if len(column) == length:
+                    column.pop()
+            raise
+        if self.chunk_size and len(self) >= self.chunk_size:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: Picklable state of the recorder, ie: its pending rows and the number of rows and chunks written.
+        """
+        return {"columns": self.columns, "chunk_count": self.chunk_count, "row_count": self.row_count}
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Restore the state of the recorder from a snapshot, so that rows recorded from then on follow the ones it holds.
+        :param snapshot: Value returned by snapshot.
+        :return: None
+        """
+        self.columns = snapshot["columns"]
+        self.chunk_count = snapshot["chunk_count"]
+        self.row_count = snapshot["row_count"]
+        self.bind()
+
+    def files(self) -> List[Path]:
+        """
+        :return: Paths of the files written so far, path itself unless the recorder is chunked.
+        """
+        if not self.chunk_size:
+            return [self.path] if self.path.exists() else []
+        return [self.chunk_path(index) for index in range(self.chunk_count)]
+
+    def chunk_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}-{index:05d}{self.path.suffix}")
+
+    def flush(self) -> None:
+        """
+        Write the pending rows to the next chunk file.
+        :return: None
+        """
+        if len(self):
+            self.write(self.chunk_path(self.chunk_count))
+            self.chunk_count += 1
+
+    def close(self) -> None:
+        """
+        Write the pending rows, to path if the recorder is not chunked, to the next chunk file otherwise.
+        :return: None
+        """
+        if self.chunk_size:
+            self.flush()
+        else:
+            self.write(self.path)
+
+    def write(self, path: Path) -> None:
+        if path.suffix == ".npz":
+            self.write_npz(path)
+        else:
+            self.write_parquet(path)
+        self.row_count += len(self)
+        self.reset()
+
+    def write_npz(self, path: Path) -> None:
+        import numpy as np
+
+        arrays = {}
+        for name, column in self.columns.items():
+            if isinstance(column, array):
+                arrays[name] = np.frombuffer(column, dtype=column.typecode) if column else np.array([], column.typecode)
+            else:
+                arrays[name] = np.array(column, dtype=object)
+        arrays[TIME_COLUMN] = arrays[TIME_COLUMN].view("datetime64[us]")
+        np.savez(path, **arrays)
+
+    def write_parquet(self, path: Path) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = {}
+        for name, column in self.columns.items():
+            if isinstance(column, array):
+                data_type = pa.timestamp("us") if name == TIME_COLUMN else getattr(pa, ARROW_TYPES[column.typecode])()
+                arrays[name] = pa.Array.from_buffers(data_type, len(column), [None, pa.py_buffer(column)])
+            else:
+                arrays[name] = pa.array(column)
+        pq.write_table(pa.table(arrays), path)
@@ -0,0 +1,280 @@
+import asyncio
+from asyncio import FIRST_COMPLETED
+import heapq
+import queue
+import threading
+from datetime import datetime, timedelta
+from itertools import count, islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+    runtime_checkable,
+)
+
+from . import processor as engine
+from .processor import now
+
+
+@runtime_checkable
+class Seekable(Protocol):
+    """
+    Past source which can skip to a given time without reading the events before it. When asp.run is given a start
+    time, seekable past sources are moved to it before being replayed.
+    """
+
+    def seek(self, timestamp: datetime) -> None:
+        """
+        Move to the first event at or after the given time, events before it are not replayed. Seeking is absolute, each
+        call replacing the previous one, so that a source can be moved back to an earlier time, while sources reading a
+        time range never read events before its start. Wrappers of other sources raise NotSeekable if those are not
+        seekable.
+        :param timestamp: Time of the first event to replay.
+        :return: None
+        """
+        ...
+
+
+def bisect_events(events: Sequence[Tuple[datetime, Any]], timestamp: datetime) -> int:
+    """
+    Position of the first event at or after timestamp in a sequence of events sorted by event time.
+    """
+    low, high = 0, len(events)
+    while low < high:
+        middle = (low + high) // 2
+        if events[middle][0] < timestamp:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class ListSource:
+    """
+    Past source over a sequence of (event_time, value) tuples sorted by event time, seeking with a binary search.
+    """
+
+    def __init__(self, events: Sequence[Tuple[datetime, Any]]):
+        self.events = events
+        self.position = 0
+
+    def seek(self, timestamp: datetime) -> None:
+        self.position = bisect_events(self.events, timestamp)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, Any]]:
+        events = self.events
+        for position in range(self.position, len(events)):
+            yield events[position]
+
+
+class ArraySource:
+    """
+    Past source over a sorted numpy datetime64 array of event times and a sequence of values of the same length, such
+    as a numpy array, seeking with numpy.searchsorted.
+    """
+
+    def __init__(self, event_times: Any, values: Sequence[Any]):
+        if len(event_times) != len(values):
+            raise ValueError("event_times and values must have the same length.")
+        self.event_times = event_times
+        self.values = values
+        self.position = 0
+
+    def seek(self, timestamp: datetime) -> None:
+        import numpy
+
+        self.position = int(numpy.searchsorted(self.event_times, numpy.datetime64(timestamp, "us"), side="left"))
+
+    def __iter__(self) -> Iterator[Tuple[datetime, Any]]:
+        event_times = self.event_times[self.position :].astype("datetime64[us]").tolist()
+        return zip(event_times, self.values[self.position :])
+
+
+class ReorderBuffer:
+    """
+    Reorder a live stream whose event times may arrive slightly out of order.
+    Events are buffered in a heap and released in event time order once the watermark, ie: the latest event time
+    seen minus the maximum lateness, has passed them. While the source is quiet the watermark keeps moving with the
+    clock so that buffered events are not held for longer than the maximum lateness. Events older than the watermark
+    are late: they are counted and passed to on_late if provided, but never forwarded.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterable[Tuple[datetime, Any]],
+        max_lateness: Union[float, timedelta],
+        on_late: Optional[Callable[[datetime, Any], None]] = None,
+    ):
+        self.source = source
+        self.max_lateness = max_lateness if isinstance(max_lateness, timedelta) else timedelta(seconds=max_lateness)
+        self.on_late = on_late
+        self.late_count = 0
+        self.watermark: Optional[datetime] = None
+        self.latest: Optional[datetime] = None
+        self.latest_arrival = datetime.min
+        self.buffer: List[Tuple[datetime, int, Any]] = []
+        self.sequence = count()
+
+    def __aiter__(self) -> AsyncIterator[Tuple[datetime, Any]]:
+        return self.events()
+
+    def push(self, event_time: datetime, value: Any) -> None:
+        if self.watermark is not None and event_time < self.watermark:
+            self.late_count += 1
+            if self.on_late:
+                self.on_late(event_time, value)
+        else:
+            heapq.heappush(self.buffer, (event_time, next(self.sequence), value))
+
+    def advance(self, watermark: datetime) -> None:
+        if self.watermark is None or watermark > self.watermark:
+            self.watermark = watermark
+
+    def elapsed(self) -> timedelta:
+        """
+        Time elapsed since the latest event arrived, used to move the watermark forward while the source is quiet.
+        """
+        return now() - self.latest_arrival
+
+    async def events(self) -> AsyncIterator[Tuple[datetime, Any]]:
+        iterator = self.source.__aiter__()
+        buffer = self.buffer
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                timeout = None
+                if buffer:
+                    # wake up in time to release the oldest buffered event even if the source goes quiet
+                    delay = buffer[0][0] + self.max_lateness - self.latest - self.elapsed()  # type: ignore
+                    timeout = max(delay.total_seconds(), 0)
+                if timeout is None:
+                    await asyncio.wait([pending])
+                else:
+                    timer = engine.processor.clock.timer(timeout)
+                    await asyncio.wait([pending, timer], return_when=FIRST_COMPLETED)
+                    timer.cancel()
+                if pending.done():
+                    try:
+                        event_time, value = pending.result()
+                    except StopAsyncIteration:
+                        pending = None
+                        break
+                    pending = None
+                    if self.latest is None or event_time > self.latest:
+                        self.latest = event_time
+                    self.latest_arrival = now()
+                    self.push(event_time, value)
+                self.advance(self.latest + self.elapsed() - self.max_lateness)  # type: ignore
+                while buffer and buffer[0][0] <= self.watermark:  # type: ignore
+                    event_time, _, value = heapq.heappop(buffer)
+                    yield event_time, value
+            while buffer:
+                event_time, _, value = heapq.heappop(buffer)
+                self.advance(event_time)
+                yield event_time, value
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+class Prefetch:
+    """
+    Iterate over a past source on a background thread, so that reading and decoding events overlaps with processing
+    them. Events are read in chunks of chunk_size and at most depth chunks are read ahead of the processor, which
+    bounds memory usage. Exceptions raised by the source are raised again by the iteration. Seeking is forwarded to the
+    source, and raises NotSeekable when it is not seekable.
+    """
+
+    def __init__(self, source: Iterable[Tuple[datetime, Any]], chunk_size: int = 1024, depth: int = 2):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.depth = depth
+
+    def seek(self, timestamp: datetime) -> None:
+        if not isinstance(self.source, Seekable):
+            raise engine.NotSeekable(f"{self.source!r} cannot be moved to {timestamp}.")
+        self.source.seek(timestamp)
+
+    def __iter__(self) -> Generator[Tuple[datetime, Any], None, None]:
+        chunks: "queue.Queue[Tuple[List[Tuple[datetime, Any]], Optional[BaseException]]]" = queue.Queue(self.depth)
+        stopped = threading.Event()
+        reader = threading.Thread(target=self.read, args=(chunks, stopped), name="asp-prefetch", daemon=True)
+        reader.start()
+        try:
+            while True:
+                chunk, exception = chunks.get()
+                if exception is not None:
+                    raise exception
+                if not chunk:
+                    break
+                yield from chunk
+        finally:
+            stopped.set()
+
+    def read(self, chunks: queue.Queue, stopped: threading.Event) -> None:
+        def put(item) -> None:
+            while not stopped.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                except queue.Full:
+                    continue
+                else:
+                    return
+
+        try:
+            iterator = iter(self.source)
+            while not stopped.is_set():
+                chunk = list(islice(iterator, self.chunk_size))
+                put((chunk, None))
+                if not chunk:
+                    break
+        except BaseException as exception:
+            put(([], exception))
+
+
+async def fetch_batches(
+    source: AsyncIterable[Tuple[datetime, Any]], batch_size: int = 1024
+) -> AsyncIterator[List[Tuple[datetime, Any]]]:
+    """
+    Iterate over an asynchronous past source in batches, fetching the next batch concurrently while the current one is
+    processed. Virtual time is held while waiting for a batch so that other streams do not get ahead of this one.
+    """
+    batches: asyncio.Queue = asyncio.Queue(1)
+
+    async def fetch() -> None:
+        batch: List[Tuple[datetime, Any]] = []
+        try:
+            async for event in source:
+                batch.append(event)
+                if len(batch) >= batch_size:
+                    await batches.put(batch)
+                    batch = []
+            if batch:
+                await batches.put(batch)
+            await batches.put(None)
+        except Exception as exception:
+            await batches.put(exception)
+
+    fetcher = asyncio.ensure_future(fetch())
+    try:
+        while True:
+            batch = await engine.processor.hold(batches.get())
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        fetcher.cancel()
@@ -0,0 +1,203 @@
+import inspect
+import io
+import pickle
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from .recorder import EPOCH
+
+SEGMENT_SUFFIX = ".pickle"
+
+
+class SpillStore:
+    """
+    Second tier of the scheduler for timers armed far in the future with call_later, eg: expiring orders or time to live
+    based state in long simulations. Timers due further than horizon from virtual time are pickled into on disk segments
+    of bucket_size each, and loaded back into the scheduler once virtual time reaches their segment, so that memory
+    usage does not grow with the number of armed timers.
+    Only timers given a module level function, or coroutine function, or a bound method and its arguments are spilled.
+    Functions are stored by reference, the instances of bound methods being kept in memory until their last timer is
+    loaded so that timers call the same instance, and arguments are pickled, ie: copied, when the timer is armed. Other
+    callables, eg: closures, partials or callable instances, would be copied too so they stay in memory, as do timers
+    which cannot be pickled.
+    The store belongs to its caller, which closes it, eg: with a with statement, and can pass it to several runs.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path, None] = None,
+        horizon: Union[float, timedelta] = timedelta(minutes=10),
+        bucket_size: Union[float, timedelta] = timedelta(minutes=10),
+        buffer_size: int = 1 << 20,
+    ):
+        """
+        :param directory: Directory of the segments, a temporary one removed on close if None.
+        :param horizon: Timers due within horizon of virtual time stay in memory, in seconds if a number.
+        :param bucket_size: Time span of each segment, in seconds if a number.
+        :param buffer_size: Size, in bytes, of the pickled timers buffered in memory before they are written to disk.
+        """
+        self.temporary = directory is None
+        self.directory = Path(tempfile.mkdtemp(prefix="asp-spill-") if directory is None else directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.horizon = horizon if isinstance(horizon, timedelta) else timedelta(seconds=horizon)
+        self.bucket_size = bucket_size if isinstance(bucket_size, timedelta) else timedelta(seconds=bucket_size)
+        self.buffer_size = buffer_size
+        self.buffers: Dict[int, bytearray] = {}
+        self.buffered = 0
+        self.buckets: List[int] = []  # sorted indices of the buckets holding spilled timers
+        self.loaded_until = datetime.min
+        self.owners: Dict[int, Any] = {}  # instances of the spilled bound methods, by id
+        self.owner_timers: Dict[int, int] = {}  # number of spilled timers of each instance
+        self.sequence = count()
+        self.spilled_count = 0
+        self.loaded_count = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        :return: Number of timers spilled and not loaded yet.
+        """
+        return self.spilled_count - self.loaded_count
+
+    def bucket(self, due_time: datetime) -> int:
+        return (due_time - EPOCH) // self.bucket_size
+
+    def segment_path(self, bucket: int) -> Path:
+        return self.directory / f"{bucket}{SEGMENT_SUFFIX}"
+
+    def add(self, due_time: datetime, virtual_time: datetime, func: Callable, args: Tuple, priority: str) -> bool:
+        """
+        Spill a timer if it is due far enough in the future, calls a function by reference and can be pickled.
+        :param due_time: Due time of the timer.
+        :param virtual_time: Current virtual time.
+        :param func: Function or coroutine function to call with the due time and args.
+        :param args: Arguments of the function.
+        :param priority: Priority class of the timer.
+        :return: Whether the timer was spilled, it should be scheduled in memory otherwise.
+        """
+        if due_time < self.loaded_until or due_time - virtual_time < self.horizon:
+            return False
+        target: Any = func
+        owner = None
+        if inspect.ismethod(func):
+            owner = func.__self__
+            target = (id(owner), func.__name__)
+        elif not is_global_function(func):
+            return False
+        try:
+            record = pickle.dumps((due_time, next(self.sequence), target, args, priority), pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if owner is not None:
+            self.owners[id(owner)] = owner
+            self.owner_timers[id(owner)] = self.owner_timers.get(id(owner), 0) + 1
+        bucket = self.bucket(due_time)
+        buffer = self.buffers.get(bucket)
+        if buffer is None:
+            buffer = self.buffers[bucket] = bytearray()
+            if not self.segment_path(bucket).exists():
+                self.insert_bucket(bucket)
+        buffer += record
+        self.buffered += len(record)
+        self.spilled_count += 1
+        if self.buffered > self.buffer_size:
+            self.flush()
+        return True
+
+    def insert_bucket(self, bucket: int) -> None:
+        buckets = self.buckets
+        index = len(buckets)
+        # buckets are mostly armed in increasing order
+        while index and buckets[index - 1] > bucket:
+            index -= 1
+        buckets.insert(index, bucket)
+
+    def flush(self) -> None:
+        """
+        Write the buffered timers to their segments.
+        :return: None
+        """
+        for bucket, buffer in self.buffers.items():
+            with open(self.segment_path(bucket), "ab") as file:
+                file.write(buffer)
+        self.buffers.clear()
+        self.buffered = 0
+
+    def load_next(self) -> List[Tuple[datetime, Callable, Tuple, str]]:
+        """
+        Load the timers of the earliest bucket, which later timers are then no longer spilled into.
+        :return: Due time, function, arguments and priority class of the timers, in due time order.
+        """
+        bucket = self.buckets.pop(0)
+        self.loaded_until = EPOCH + (bucket + 1) * self.bucket_size
+        path = self.segment_path(bucket)
+        records = []
+        if path.exists():
+            records.extend(read_records(path.read_bytes()))
+            path.unlink()
+        buffer = self.buffers.pop(bucket, None)
+        if buffer is not None:
+            self.buffered -= len(buffer)
+            records.extend(read_records(buffer))
+        records.sort(key=lambda record: record[:2])
+        self.loaded_count += len(records)
+        timers = []
+        for due_time, _, target, args, priority in records:
+            if isinstance(target, tuple):
+                owner_id, name = target
+                target = getattr(self.owners[owner_id], name)
+                self.owner_timers[owner_id] -= 1
+                if not self.owner_timers[owner_id]:
+                    del self.owners[owner_id], self.owner_timers[owner_id]
+            timers.append((due_time, target, args, priority))
+        return timers
+
+    def clear(self) -> None:
+        """
+        Drop the spilled timers, eg: those left by a run which raised.
+        :return: None
+        """
+        self.buffers.clear()
+        self.buffered = 0
+        for bucket in self.buckets:
+            self.segment_path(bucket).unlink(missing_ok=True)
+        self.buckets.clear()
+        self.loaded_until = datetime.min
+        self.owners.clear()
+        self.owner_timers.clear()
+        self.loaded_count = self.spilled_count
+
+    def close(self) -> None:
+        """
+        Drop the spilled timers, removing the directory of the segments if it is temporary.
+        :return: None
+        """
+        self.clear()
+        if self.temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.closed = True
+
+
+def is_global_function(func: Callable) -> bool:
+    """
+    :return: Whether func is a function pickled by reference, ie: defined at the top level of a module.
+    """
+    return inspect.isfunction(func) and func.__closure__ is None and func.__qualname__ == func.__name__
+
+
+def read_records(data: Union[bytes, bytearray]) -> List[Tuple[datetime, int, Any, Tuple, str]]:
+    records = []
+    file = io.BytesIO(data)
+    while file.tell() < len(data):
+        records.append(pickle.load(file))
+    return records
@@ -0,0 +1,183 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Union
+
+
+class Welford:
+    """
+    Running count, mean and variance of a stream of values, updated in constant time and memory with Welford's
+    algorithm. Instances computed over separate partitions of a stream can be merged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """
+        :return: Sample variance of the values, nan if there are less than two of them.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def merge(self, other: "Welford") -> None:
+        """
+        Add the values of another instance to this one.
+        :param other: Instance computed over another partition of the stream.
+        :return: None
+        """
+        count = self.count + other.count
+        if not count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+
+class EWMA:
+    """
+    Exponentially weighted moving average of irregularly spaced values, whose weights decay with the time elapsed
+    between events rather than with their number: the weight of a value halves every half_life.
+    """
+
+    def __init__(self, half_life: Union[float, timedelta]):
+        self.half_life = half_life if isinstance(half_life, timedelta) else timedelta(seconds=half_life)
+        self.value = math.nan
+        self.last_time: Optional[datetime] = None
+
+    def update(self, event_time: datetime, value: float) -> float:
+        """
+        :param event_time: Time of the value, not earlier than the previous one.
+        :param value: New value.
+        :return: Updated average.
+        """
+        if self.last_time is None:
+            self.value = value
+        else:
+            decay = 0.5 ** ((event_time - self.last_time) / self.half_life)
+            self.value = value + decay * (self.value - value)
+        self.last_time = event_time
+        return self.value
+
+
+class Buckets(Dict[int, int]):
+    """
+    Counts of values by bucket index, with the index of the lowest bucket once buckets have been collapsed, which then
+    also counts all the values below it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lowest: Optional[int] = None
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch, after DDSketch: values are counted in logarithmically sized buckets so that quantiles are
+    estimated within relative_accuracy of an actual value of the stream. At most max_buckets buckets are kept for
+    positive and negative values each, the buckets of the smallest magnitudes being collapsed beyond that, which keeps
+    memory constant over unbounded streams at the expense of the accuracy for values closest to zero.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = Buckets()
+        self.negative = Buckets()
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def bucket_value(self, index: int) -> float:
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def update(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            self.add(self.positive, self.index(value), count)
+        elif value < 0:
+            self.add(self.negative, self.index(-value), count)
+        else:
+            self.zero_count += count
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add(self, buckets: Buckets, index: int, count: int) -> None:
+        lowest = buckets.lowest
+        if lowest is not None and index < lowest:
+            index = lowest
+        if index in buckets:
+            buckets[index] += count
+            return
+        buckets[index] = count
+        if len(buckets) > self.max_buckets:
+            if lowest is None:
+                lowest = min(buckets)
+            # the lowest bucket only moves up, by as many indexes as it ever does in total, ie: amortised constant time
+            while len(buckets) > self.max_buckets:
+                lowest_count = buckets.pop(lowest)
+                lowest += 1
+                buckets[lowest] = buckets.get(lowest, 0) + lowest_count
+            buckets.lowest = lowest
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: Quantile, between 0 and 1.
+        :return: Estimate of the quantile, exact for the minimum and maximum, nan if no values were added.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1.")
+        if not self.count:
+            return math.nan
+        if q in (0, 1):
+            return self.min if q == 0 else self.max
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return max(-self.bucket_value(index), self.min)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Add the values of another sketch to this one.
+        :param other: Sketch computed over another partition of the stream, with the same relative accuracy.
+        :return: None
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        for buckets, other_buckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in other_buckets.items():
+                self.add(buckets, index, count)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
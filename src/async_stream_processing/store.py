@@ -0,0 +1,159 @@
+import heapq
+import pickle
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .recorder import EPOCH, MICROSECOND
+
+
+def to_timestamp(event_time: datetime) -> int:
+    return (event_time - EPOCH) // MICROSECOND
+
+
+def from_timestamp(timestamp: int) -> datetime:
+    return EPOCH + timedelta(microseconds=timestamp)
+
+
+class SQLiteStore:
+    """
+    File based store of timestamped events, grouped in named streams, which can be replayed as past sources.
+    Event times are stored as microseconds since the epoch and values as pickled payloads, indexed by stream and event
+    time so that time range queries only read the matching rows. Each read opens its own connection, so that queries
+    can be iterated on another thread, eg: with Prefetch.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 4096):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS events"
+            " (stream TEXT NOT NULL, event_time INTEGER NOT NULL, payload BLOB NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS events_stream_time ON events (stream, event_time)")
+        self.connection.commit()
+
+    def __enter__(self) -> "SQLiteStore":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def append(self, stream: str, event_time: datetime, value: Any) -> None:
+        """
+        Append a single event to a stream, use extend to append many events at once.
+        :param stream: Name of the stream.
+        :param event_time: Time of the event.
+        :param value: Value of the event, must be picklable.
+        :return: None
+        """
+        self.extend(stream, [(event_time, value)])
+
+    def extend(self, stream: str, events: Iterable[Tuple[datetime, Any]]) -> None:
+        """
+        Append events to a stream in a single transaction.
+        :param stream: Name of the stream.
+        :param events: Iterable of (event_time, value) tuples.
+        :return: None
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO events (stream, event_time, payload) VALUES (?, ?, ?)",
+                (
+                    (stream, to_timestamp(event_time), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+                    for event_time, value in events
+                ),
+            )
+
+    def streams(self) -> List[str]:
+        """
+        :return: Names of the stored streams.
+        """
+        return [stream for (stream,) in self.connection.execute("SELECT DISTINCT stream FROM events ORDER BY stream")]
+
+    def read(
+        self, stream: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None
+    ) -> Iterator[Tuple[datetime, Any]]:
+        # sqlite connections can only be used by the thread which opened them
+        connection = sqlite3.connect(self.path)
+        cursor = connection.execute(
+            "SELECT event_time, payload FROM events WHERE stream = ? AND event_time >= ? AND event_time < ?"
+            " ORDER BY event_time",
+            (
+                stream,
+                to_timestamp(start_time) if start_time else -(2**63),
+                to_timestamp(end_time) if end_time else 2**63 - 1,
+            ),
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for timestamp, payload in rows:
+                    yield from_timestamp(timestamp), pickle.loads(payload)
+        finally:
+            cursor.close()
+            connection.close()
+
+    def query(
+        self,
+        streams: Union[str, Sequence[str]],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> "Query":
+        """
+        Read the events of one or many streams in a time range, to be used as a past source.
+        :param streams: Name of a stream, or names of streams to merge in event time order.
+        :param start_time: Time of the first events to read, included.
+        :param end_time: Time of the last events to read, excluded.
+        :return: Seekable iterable of (event_time, value) tuples for a single stream, (event_time, (stream, value))
+            otherwise.
+        """
+        return Query(self, streams, start_time, end_time)
+
+
+class Query:
+    """
+    Events of one or many streams of a SQLiteStore in a time range. Seeking moves the start of the range, which is then
+    looked up in the index rather than read. Each iteration reads the range again.
+    """
+
+    def __init__(
+        self,
+        store: SQLiteStore,
+        streams: Union[str, Sequence[str]],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+    ):
+        self.store = store
+        self.streams = streams
+        self.start_time = start_time
+        self.end_time = end_time
+        self.seek_time: Optional[datetime] = None
+
+    def seek(self, timestamp: datetime) -> None:
+        self.seek_time = timestamp
+
+    def __iter__(self) -> Iterator[Tuple[datetime, Any]]:
+        start_time = self.start_time
+        if self.seek_time is not None:
+            start_time = self.seek_time if start_time is None else max(start_time, self.seek_time)
+        if isinstance(self.streams, str):
+            return self.store.read(self.streams, start_time, self.end_time)
+        return iter(
+            heapq.merge(
+                *(label(stream, self.store.read(stream, start_time, self.end_time)) for stream in self.streams),
+                key=lambda event: event[0],
+            )
+        )
+
+
+def label(stream: str, events: Iterable[Tuple[datetime, Any]]) -> Iterator[Tuple[datetime, Tuple[str, Any]]]:
+    for event_time, value in events:
+        yield event_time, (stream, value)
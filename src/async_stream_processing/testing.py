@@ -1,6 +1,11 @@
 import asyncio
+import heapq
 from datetime import datetime, timedelta
-from typing import Any, AsyncIterable, Iterable, Tuple
+from itertools import count
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple, Union
+
+from . import processor as engine
+from .processor import Clock
 
 
 def timestamps(start: datetime, delay: timedelta):
@@ -12,8 +17,116 @@ def timestamps(start: datetime, delay: timedelta):
 
 async def create_async_generator(values: Iterable[Any], delay: float = 1.0) -> AsyncIterable[Tuple[datetime, Any]]:
     """ "
-    Yield values in the future with a delay.
+    Yield values in the future with a delay, on the clock of the processor.
     """
+    clock = engine.processor.clock if engine.processor is not None else Clock()
     for value in values:
-        yield datetime.now(), value
-        await asyncio.sleep(delay)
+        yield clock.now(), value
+        await clock.sleep(delay)
+
+
+class FakeClock(Clock):
+    """
+    Simulated wall clock, to be passed to asp.run, which only moves when the processor would otherwise wait: it then
+    jumps straight to the next timer or timeout, so that live streams run deterministically and without actually
+    waiting. Live sources should wait on this clock, eg: with its sleep or sleep_until, rather than on asyncio. The
+    clock only moves once no other task is ready to run, and never while the processor holds virtual time for functions
+    running in an executor: it then waits for them in real time, as it does for anything else awaited while no timer is
+    armed. Blocking work running in threads should therefore be offloaded through the processor. Requires the default
+    asyncio event loop, whose ready callbacks are inspected.
+    """
+
+    def __init__(self, start_time: datetime):
+        self.time = start_time
+        self.timers: List[Tuple[datetime, int, asyncio.Future]] = []
+        self.sequence = count()
+
+    def now(self) -> datetime:  # type: ignore
+        return self.time
+
+    def advance(self, delay: Union[float, timedelta]) -> None:
+        """
+        Move the clock forward, completing the timers due by then.
+        :param delay: Delay, in seconds if a number.
+        :return: None
+        """
+        self.advance_to(self.time + (delay if isinstance(delay, timedelta) else timedelta(seconds=delay)))
+
+    def advance_to(self, time: datetime) -> None:
+        self.time = max(self.time, time)
+        timers = self.timers
+        while timers and timers[0][0] <= self.time:
+            future = heapq.heappop(timers)[2]
+            if not future.done():
+                future.set_result(None)
+
+    def timer_at(self, time: datetime) -> asyncio.Future:
+        """
+        :param time: Time on this clock.
+        :return: Future completed once the clock reaches time.
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.timers, (time, next(self.sequence), future))
+        return future
+
+    def timer(self, delay: float) -> asyncio.Future:
+        return self.timer_at(self.time + timedelta(seconds=delay))
+
+    async def sleep(self, delay: float) -> None:
+        await self.timer(delay)
+
+    async def sleep_until(self, time: datetime) -> None:
+        await self.timer_at(time)
+
+    async def wait(self, futures: List[asyncio.Future], timeout: Optional[float]) -> Set[asyncio.Future]:
+        deadline = None if timeout is None else self.time + timedelta(seconds=max(timeout, 0))
+        if not futures:
+            self.advance_to(deadline)  # type: ignore
+            return set()
+        loop = asyncio.get_running_loop()
+        while True:
+            done = {future for future in futures if future.done()}
+            if done:
+                return done
+            if loop._ready:  # type: ignore
+                # let tasks woken up by a timer run before moving the clock again
+                await asyncio.sleep(0)
+                continue
+            if engine.processor is not None and engine.processor.holds:
+                return await super().wait(futures, None)
+            timers = self.timers
+            while timers and timers[0][2].done():  # cancelled
+                heapq.heappop(timers)
+            next_time = timers[0][0] if timers else None
+            if deadline is not None and (next_time is None or deadline < next_time):
+                self.advance_to(deadline)
+                return set()
+            if next_time is None:
+                return await super().wait(futures, None)
+            self.advance_to(next_time)
+
+
+async def simulated_source(
+    events: Iterable[Tuple[datetime, Any]],
+    latency: Union[float, timedelta, Callable[[datetime, Any], Union[float, timedelta]]] = 0.0,
+) -> AsyncIterator[Tuple[datetime, Any]]:
+    """
+    Live source delivering events on the clock of the processor, typically a FakeClock, once it reaches their event
+    time plus latency. Events are delivered in arrival order, so a latency function varying from one event to the next
+    simulates events arriving out of order.
+    :param events: Events, ie: (event_time, value) tuples.
+    :param latency: Delay between the event time and arrival of events, in seconds if a number, or a function of the
+        event time and value returning it.
+    :return: Asynchronous iterator of the events.
+    """
+    clock = engine.processor.clock if engine.processor is not None else Clock()
+    arrivals = []
+    for event_time, value in events:
+        delay = latency(event_time, value) if callable(latency) else latency
+        arrival_time = event_time + (delay if isinstance(delay, timedelta) else timedelta(seconds=delay))
+        arrivals.append((arrival_time, event_time, value))
+    arrivals.sort(key=lambda arrival: arrival[0])
+    for arrival_time, event_time, value in arrivals:
+        if arrival_time > clock.now():
+            await clock.sleep_until(arrival_time)
+        yield event_time, value
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import random
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Tuple, Union
+
+from . import processor as engine
+from .stats import Welford
+
+DECODERS = {"json": json.loads}
+
+
+class ConnectionStats:
+    """
+    Metrics of a connection: number of messages received, and skipped as they could not be decoded, and lag, ie: delay
+    between the event time of messages and their dispatch to the stream, in seconds.
+    """
+
+    def __init__(self, connected_at: datetime):
+        self.connected_at = connected_at
+        self.disconnected_at: Optional[datetime] = None
+        self.messages = 0
+        self.decode_errors = 0
+        self.lag = Welford()
+        self.max_lag = 0.0
+
+    def record(self, lag: float) -> None:
+        self.messages += 1
+        self.lag.update(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+
+class Undecodable(NamedTuple):
+    message: Any
+    error: Exception
+
+
+class WebSocketSource:
+    """
+    Live source of the messages received on a websocket, to be used as the future of process_stream. Requires the
+    websockets package unless another connect function is given.
+    Messages are received on a separate task and dispatched in batches of all those received since the previous batch,
+    so that a burst does not cost an engine round trip per message. At most max_buffer messages are buffered, the
+    connection is no longer read from once they are, so that a slow stream pushes back on the server rather than growing
+    memory usage. Messages which cannot be decoded are skipped and passed to on_decode_error. Failed connections are
+    retried with exponential backoff and jitter, and connections closed by the server are reopened unless stop_on_close
+    is set.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        decode: Union[str, Callable[[Any], Any], None] = None,
+        timestamp: Optional[Callable[[Any], datetime]] = None,
+        on_connect: Optional[Callable[[Any], Awaitable]] = None,
+        executor: Optional[Executor] = None,
+        initial_backoff: Union[float, timedelta] = 0.1,
+        max_backoff: Union[float, timedelta] = 30,
+        max_retries: Optional[int] = None,
+        stop_on_close: bool = False,
+        connect: Optional[Callable[[str], Any]] = None,
+        max_buffer: int = 10_000,
+        on_decode_error: Optional[Callable[[Any, Exception], None]] = None,
+    ):
+        """
+        :param uri: Address of the websocket server.
+        :param decode: "json", or a function decoding messages, which are passed as received otherwise.
+        :param timestamp: Function returning the event time of a decoded message, its arrival time otherwise.
+        :param on_connect: Coroutine function called with each new connection, eg: to send subscriptions.
+        :param executor: Executor to decode batches of messages in, rather than on the event loop.
+        :param initial_backoff: Delay before the first reconnection attempt, in seconds if a number.
+        :param max_backoff: Maximum delay between reconnection attempts, in seconds if a number.
+        :param max_retries: Number of consecutive failed attempts after which the last error is raised, never if None.
+        :param stop_on_close: End the stream when the server closes the connection normally rather than reconnecting.
+        :param connect: Function returning an asynchronous context manager of a connection, which is an asynchronous
+            iterable of messages, websockets.connect by default.
+        :param max_buffer: Maximum number of messages received and not dispatched yet.
+        :param on_decode_error: Function called with messages which cannot be decoded and the error raised.
+        """
+        self.uri = uri
+        self.decode = DECODERS[decode] if isinstance(decode, str) else decode
+        self.timestamp = timestamp
+        self.on_connect = on_connect
+        self.executor = executor
+        self.initial_backoff = seconds(initial_backoff)
+        self.max_backoff = seconds(max_backoff)
+        self.max_retries = max_retries
+        self.stop_on_close = stop_on_close
+        self.connect: Callable[[str], Any]
+        if connect is None:
+            import websockets
+
+            self.connect = websockets.connect
+        else:
+            self.connect = connect
+        self.max_buffer = max_buffer
+        self.on_decode_error = on_decode_error
+        self.connections: List[ConnectionStats] = []
+        self.batch_count = 0
+
+    def __aiter__(self) -> AsyncIterator[Tuple[datetime, Any]]:
+        return self.events()
+
+    def backoff(self, failures: int) -> float:
+        delay = min(self.max_backoff, self.initial_backoff * 2 ** max(failures - 1, 0))
+        return delay * random.uniform(0.5, 1)
+
+    async def receive(self, buffer: "asyncio.Queue[Tuple[datetime, Any, ConnectionStats]]") -> None:
+        failures = 0
+        while True:
+            connection_stats = None
+            try:
+                async with self.connect(self.uri) as connection:
+                    failures = 0
+                    connection_stats = ConnectionStats(engine.now())
+                    self.connections.append(connection_stats)
+                    if self.on_connect:
+                        await self.on_connect(connection)
+                    async for message in connection:
+                        await buffer.put((engine.now(), message, connection_stats))
+            except Exception:
+                failures += 1
+                if self.max_retries is not None and failures > self.max_retries:
+                    raise
+            else:
+                if self.stop_on_close:
+                    return
+            finally:
+                if connection_stats is not None:
+                    connection_stats.disconnected_at = engine.now()
+            await asyncio.sleep(self.backoff(failures))
+
+    def decode_batch(self, messages: List[Any]) -> List[Any]:
+        """
+        :return: Decoded messages, Undecodable for those whose decoding raised.
+        """
+        decode: Callable[[Any], Any] = self.decode  # type: ignore
+        values = []
+        for message in messages:
+            try:
+                values.append(decode(message))
+            except Exception as error:
+                values.append(Undecodable(message, error))
+        return values
+
+    async def events(self) -> AsyncIterator[Tuple[datetime, Any]]:
+        loop = asyncio.get_running_loop()
+        buffer: "asyncio.Queue[Tuple[datetime, Any, ConnectionStats]]" = asyncio.Queue(self.max_buffer)
+        receiver = asyncio.ensure_future(self.receive(buffer))
+        getter: Optional[asyncio.Future] = None
+        try:
+            while True:
+                batch = []
+                if getter is not None and getter.done():
+                    batch.append(getter.result())
+                    getter = None
+                while not buffer.empty():
+                    batch.append(buffer.get_nowait())
+                if not batch:
+                    if receiver.done():
+                        receiver.result()
+                        return
+                    if getter is None:
+                        getter = asyncio.ensure_future(buffer.get())
+                    await asyncio.wait([getter, receiver], return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                self.batch_count += 1
+                messages = [message for _, message, _ in batch]
+                if self.decode is None:
+                    values = messages
+                elif self.executor is not None:
+                    values = await loop.run_in_executor(self.executor, self.decode_batch, messages)
+                else:
+                    values = self.decode_batch(messages)
+                for (arrival_time, _, connection_stats), value in zip(batch, values):
+                    if isinstance(value, Undecodable):
+                        connection_stats.decode_errors += 1
+                        if self.on_decode_error is not None:
+                            self.on_decode_error(value.message, value.error)
+                        continue
+                    event_time = self.timestamp(value) if self.timestamp else arrival_time
+                    connection_stats.record((engine.now() - event_time).total_seconds())
+                    yield event_time, value
+        finally:
+            if getter is not None:
+                getter.cancel()
+            receiver.cancel()
+
+
+def seconds(delay: Union[float, timedelta]) -> float:
+    return delay.total_seconds() if isinstance(delay, timedelta) else delay
@@ -0,0 +1,174 @@
+import os
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.cache import ResultCache
+from async_stream_processing.journal import JournalReader, JournalWriter
+from async_stream_processing.testing import timestamps
+
+START_TIME = datetime(2025, 1, 1)
+
+
+class Strategy:
+    def __init__(self, scale: int):
+        self.scale = scale
+        self.total = 0
+
+    def on_event(self, _event_time: datetime, value: int):
+        self.total += value * self.scale
+        calls.append(value)
+        recorder.record(self.total)
+
+
+calls: List[int] = []
+recorder: asp.Recorder = None  # type: ignore
+
+
+def write_events(directory, start: int, count: int):
+    events = timestamps(START_TIME + timedelta(seconds=start), delay=timedelta(seconds=1))
+    with JournalWriter(directory) as writer:
+        for event_time, value in zip(events, range(start, start + count)):
+            writer.write(event_time, value)
+
+
+async def cached_run(cache: ResultCache, history, output, scale: int = 1, seekable: bool = True) -> Strategy:
+    global recorder
+    recorder = asp.Recorder(output, {"total": "q"})
+    calls.clear()
+
+    def past():
+        reader = JournalReader(history)
+        return reader if seekable else (event for event in reader)
+
+    return await cache.run(
+        lambda strategy: [asp.process_stream(callback=strategy.on_event, past=past())],
+        Strategy(scale),
+        sources=[history],
+        start_time=START_TIME,
+        recorders=[recorder],
+        code=Strategy,
+        parameters={"scale": scale},
+    )
+
+
+async def test_cache(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    cache = ResultCache(tmp_path / "cache")
+    history, output = tmp_path / "history", tmp_path / "totals.npz"
+    write_events(history, 0, 100)
+
+    strategy = await cached_run(cache, history, output)
+    assert (cache.last_outcome, strategy.total, len(calls)) == ("miss", sum(range(100)), 100)
+
+    output.unlink()
+    strategy = await cached_run(cache, history, output)
+    assert (cache.last_outcome, strategy.total, len(calls)) == ("hit", sum(range(100)), 0)
+    assert len(numpy.load(output)["total"]) == 100
+
+    write_events(history, 100, 50)
+    strategy = await cached_run(cache, history, output)
+    assert (cache.last_outcome, strategy.total, calls) == ("resume", sum(range(150)), list(range(100, 150)))
+    assert list(numpy.load(output)["total"]) == list(numpy.cumsum(range(150)))
+
+    strategy = await cached_run(cache, history, output, scale=2)
+    assert (cache.last_outcome, strategy.total) == ("miss", 2 * sum(range(150)))
+
+
+async def test_eviction(tmp_path):
+    pytest.importorskip("numpy")
+    cache = ResultCache(tmp_path / "cache")
+    history, output = tmp_path / "history", tmp_path / "totals.npz"
+    write_events(history, 0, 10)
+    for scale in (1, 2, 3):
+        await cached_run(cache, history, output, scale=scale)
+    entries = sorted(cache.directory.iterdir(), key=lambda entry: (entry / "meta.json").stat().st_mtime_ns)
+    await cached_run(cache, history, output, scale=1)
+    assert cache.last_outcome == "hit"
+    size = sum(file.stat().st_size for file in entries[0].rglob("*") if file.is_file())
+    cache.max_size = 2 * size + size // 2
+    cache.evict()
+    # the entry of scale 2 is the least recently used one
+    assert sorted(cache.directory.iterdir()) == sorted([entries[0], entries[2]])
+
+
+async def test_not_seekable(tmp_path):
+    """
+    runs whose sources are not seekable are not resumed, runs whose sources were only touched are hits.
+    """
+    pytest.importorskip("numpy")
+    cache = ResultCache(tmp_path / "cache")
+    history, output = tmp_path / "history", tmp_path / "totals.npz"
+    write_events(history, 0, 10)
+    strategy = await cached_run(cache, history, output, seekable=False)
+    assert (cache.last_outcome, strategy.total) == ("miss", 45)
+
+    for file in history.iterdir():
+        os.utime(file, ns=(file.stat().st_atime_ns, file.stat().st_mtime_ns + 10**9))
+    strategy = await cached_run(cache, history, output, seekable=False)
+    assert (cache.last_outcome, strategy.total, len(calls)) == ("hit", 45, 0)
+
+    write_events(history, 10, 5)
+    strategy = await cached_run(cache, history, output, seekable=False)
+    assert (cache.last_outcome, strategy.total, len(calls)) == ("miss", sum(range(15)), 15)
+
+
+async def test_resume_end_time(tmp_path):
+    """
+    runs are resumed just after their last past event, whatever the virtual time they ended at.
+    """
+    pytest.importorskip("numpy")
+    cache = ResultCache(tmp_path / "cache")
+    history, output = tmp_path / "history", tmp_path / "totals.npz"
+    write_events(history, 0, 10)
+    await cached_run(cache, history, output)
+    with JournalWriter(history) as writer:
+        writer.write(START_TIME + timedelta(seconds=9, microseconds=1), 100)
+    strategy = await cached_run(cache, history, output)
+    assert (cache.last_outcome, strategy.total, calls) == ("resume", 145, [100])
+
+
+async def test_pending_timers(tmp_path):
+    """
+    runs which resumed timers after their last past event are started again from scratch instead of being resumed.
+    """
+    pytest.importorskip("numpy")
+    cache = ResultCache(tmp_path / "cache")
+    history, output = tmp_path / "history", tmp_path / "totals.npz"
+    write_events(history, 0, 10)
+    fired: List[datetime] = []
+
+    async def run():
+        strategy = Strategy(1)
+
+        def on_event(event_time: datetime, value: int):
+            strategy.on_event(event_time, value)
+            asp.call_later(timedelta(seconds=5), fired.append)
+
+        return await cache.run(
+            lambda _: [asp.process_stream(callback=on_event, past=JournalReader(history))],
+            strategy,
+            sources=[history],
+            start_time=START_TIME,
+            recorders=[asp.Recorder(output, {"total": "q"})],
+        )
+
+    global recorder
+    recorder = asp.Recorder(output, {"total": "q"})
+    await run()
+    assert (cache.last_outcome, len(fired)) == ("miss", 10)
+
+    write_events(history, 10, 5)
+    fired.clear()
+    recorder = asp.Recorder(output, {"total": "q"})
+    strategy = await run()
+    assert (cache.last_outcome, strategy.total, len(fired)) == ("miss", sum(range(15)), 15)
+
+
+def test_code_version(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.key([], START_TIME, [], Strategy, None) != cache.key([], START_TIME, [], "", None)
+    with pytest.raises(ValueError):
+        cache.key([], START_TIME, [], dict, None)
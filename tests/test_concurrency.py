@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import FakeClock, simulated_source
+
+NOW = datetime(2025, 1, 1, 12)
+LATENCY = 0.05
+
+
+def events(count: int):
+    return simulated_source((NOW + timedelta(milliseconds=index), index) for index in range(count))
+
+
+@pytest.mark.parametrize("preserve_order", [True, False])
+async def test_max_in_flight(preserve_order: bool):
+    clock = FakeClock(NOW)
+    results = []
+    running: List[int] = []
+    max_running = 0
+
+    async def acknowledge(_event_time: datetime, value: int) -> int:
+        nonlocal max_running
+        running.append(value)
+        max_running = max(max_running, len(running))
+        await clock.sleep(LATENCY * (1 + value % 3) / 3)  # simulate waiting for an acknowledgement
+        await asp.sleep(0.001)
+        running.remove(value)
+        return value
+
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=acknowledge,
+                future=events(20),
+                max_in_flight=10,
+                preserve_order=preserve_order,
+                on_result=lambda _event_time, result: results.append(result),
+            )
+        ],
+        clock=clock,
+    )
+    assert max_running == 10
+    assert clock.now() - NOW < timedelta(seconds=20 * LATENCY / 2)
+    assert sorted(results) == list(range(20))
+    assert (results == list(range(20))) is preserve_order
+
+
+@pytest.mark.parametrize("preserve_order", [True, False])
+async def test_max_in_flight_errors(preserve_order: bool):
+    """
+    callbacks still running when one of them raises are cancelled.
+    """
+    clock = FakeClock(NOW)
+    cancelled = []
+
+    async def failing_callback(_event_time: datetime, value: int):
+        try:
+            await clock.sleep(0.01 if value == 0 else 10)
+        except BaseException:
+            cancelled.append(value)
+            raise
+        if value == 0:
+            raise ValueError("rejected")
+
+    with pytest.raises(ValueError):
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=failing_callback, future=events(10), max_in_flight=4, preserve_order=preserve_order
+                )
+            ],
+            clock=clock,
+        )
+    await asyncio.sleep(0)  # like tasks, spawned coroutines are cancelled on the next event loop iteration
+    assert sorted(cancelled) == [1, 2, 3]
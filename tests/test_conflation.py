@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.conflation import OHLC
+from async_stream_processing.testing import create_async_generator, timestamps
+
+START_TIME = datetime(2025, 1, 1)
+PRICES = [10, 12, 9, 11, 13, 8, 10, 14, 12, 11]
+
+
+async def replay(conflator: asp.Conflator, values):
+    past_values = list(zip(timestamps(START_TIME, delay=timedelta(milliseconds=250)), values))
+    await asp.run([asp.process_stream(callback=conflator, past=past_values)], start_time=START_TIME)
+
+
+async def test_ohlc():
+    bars = []
+    conflator = asp.Conflator(lambda bar_end, value: bars.append((bar_end, asp.now(), value)), 1, how="ohlc")
+    await replay(conflator, PRICES)
+    assert [value for _, _, value in bars] == [OHLC(10, 12, 9, 11), OHLC(13, 14, 8, 14), OHLC(12, 12, 11, 11)]
+    for index, (bar_end, virtual_time, _) in enumerate(bars):
+        assert bar_end == START_TIME + timedelta(seconds=index + 1)
+        assert virtual_time >= bar_end
+    assert (conflator.event_count, conflator.bar_count) == (10, 3)
+
+
+async def test_sum_by_key():
+    bars = []
+
+    async def on_bar(_bar_end: datetime, value):
+        bars.append(value)
+
+    conflator = asp.Conflator(on_bar, timedelta(seconds=1), key=lambda trade: trade[0], how="sum", field=lambda t: t[1])
+    await replay(conflator, [("X" if index % 2 else "Y", price) for index, price in enumerate(PRICES)])
+    assert bars == [{"Y": 19, "X": 23}, {"Y": 23, "X": 22}, {"Y": 12, "X": 11}]
+
+
+def test_unknown_aggregation():
+    with pytest.raises(ValueError):
+        asp.Conflator(print, 1, how="median")
+
+
+async def test_conflate_live():
+    bars = []
+    await asp.run(
+        [asp.conflate(create_async_generator(range(50), delay=0.002), 0.05, lambda _bar_end, value: bars.append(value))]
+    )
+    assert len(bars) < 10
+    assert bars == sorted(bars)
+    assert bars[-1] == 49
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import timestamps
+
+DURATION = 0.05
+
+
+async def test_process_stream_executor():
+    """
+    blocking callbacks of independent streams run in parallel, each stream processing its events in order.
+    """
+    start_time = datetime(2025, 1, 1)
+    calls = []
+    # each callback waits for the one of the other stream, which only returns if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def blocking_callback(event_time: datetime, value):
+        barrier.wait()
+        calls.append((event_time, value))
+
+    streams = {name: list(zip(timestamps(start_time, delay=timedelta(seconds=1)), range(5))) for name in "ab"}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=lambda event_time, value, name=name: blocking_callback(event_time, (name, value)),
+                    past=past_values,
+                    executor=executor,
+                )
+                for name, past_values in streams.items()
+            ],
+            start_time=start_time,
+        )
+    for name in streams:
+        assert [value for _, (stream, value) in calls if stream == name] == list(range(5))
+    event_times = [event_time for event_time, _ in calls]
+    assert event_times == sorted(event_times)
+
+
+async def test_virtual_time_held():
+    """
+    events due after an offloaded call are not processed before it returns.
+    """
+    start_time = datetime(2025, 1, 1)
+    calls = []
+
+    def blocking_callback(event_time: datetime, value):
+        time.sleep(DURATION)
+        calls.append(value)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        await asp.run(
+            [
+                asp.process_stream(callback=blocking_callback, past=[(start_time, "blocking")], executor=executor),
+                asp.process_stream(
+                    callback=lambda _event_time, value: calls.append(value),
+                    past=[(start_time + timedelta(milliseconds=1), "next")],
+                ),
+            ],
+            start_time=start_time,
+        )
+    assert calls == ["blocking", "next"]
+
+
+async def test_call_later_executor():
+    start_time = datetime(2025, 1, 1)
+    calls = []
+
+    def blocking_callback(event_time: datetime, value):
+        time.sleep(DURATION)
+        calls.append((event_time, value))
+
+    async def schedule():
+        asp.call_later(timedelta(seconds=1), blocking_callback, "offloaded", executor=executor)
+        asp.call_later(timedelta(seconds=2), lambda event_time: calls.append((event_time, "next")))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        await asp.run([schedule()], start_time=start_time)
+    assert [value for _, value in calls] == ["offloaded", "next"]
+
+    async def invalid():
+        async def coroutine(_event_time):
+            pass
+
+        asp.call_later(None, coroutine, executor=executor)
+
+    with pytest.raises(ValueError):
+        await asp.run([invalid()], start_time=start_time)
@@ -0,0 +1,55 @@
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Process
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.ipc import RingReader, RingWriter
+from async_stream_processing.testing import timestamps
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="named pipes are required")
+
+START_TIME = datetime(2025, 1, 1)
+RECORD_FORMAT = "dq"
+EVENT_COUNT = 1000
+
+
+def feed_handler(name: str, pause: float):
+    with RingWriter(name, RECORD_FORMAT) as writer:
+        for index, event_time in zip(range(EVENT_COUNT), timestamps(START_TIME, delay=timedelta(milliseconds=1))):
+            writer.write(event_time, index / 2, index)
+            if index % 100 == 0:
+                time.sleep(pause)  # let the reader wait for records
+
+
+@pytest.mark.parametrize("capacity", [16, 4096])
+async def test_ring(capacity: int):
+    received = []
+    with RingReader(None, RECORD_FORMAT, capacity=capacity) as reader:
+        producer = Process(target=feed_handler, args=(reader.name, 0.01))
+        producer.start()
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=lambda event_time, price, size: received.append((event_time, price, size)),
+                    future=reader,
+                    unpack_args=True,
+                )
+            ]
+        )
+        producer.join()
+    assert received == [
+        (event_time, index / 2, index)
+        for index, event_time in zip(range(EVENT_COUNT), timestamps(START_TIME, delay=timedelta(milliseconds=1)))
+    ]
+
+
+def test_ring_full():
+    with RingWriter(None, RECORD_FORMAT, capacity=2) as writer:
+        assert writer.write(START_TIME, 1.0, 1)
+        assert writer.write(START_TIME, 2.0, 2)
+        assert not writer.write(START_TIME, 3.0, 3, timeout=0.01)
+        with pytest.raises(ValueError):
+            RingReader(writer.name, "d")
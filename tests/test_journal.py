@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import async_stream_processing as asp
+from async_stream_processing.journal import JournalReader, JournalWriter
+from async_stream_processing.testing import create_async_generator, timestamps
+
+START_TIME = datetime(2025, 1, 1)
+
+
+def test_segments(tmp_path):
+    events = list(zip(timestamps(START_TIME, delay=timedelta(seconds=1)), range(1000)))
+    with JournalWriter(tmp_path, segment_size=4096, flush_size=512, index_interval=16) as writer:
+        for event_time, value in events:
+            writer.write(event_time, {"value": value})
+    assert len(list(tmp_path.glob("*.log"))) > 2
+    assert [(event_time, value["value"]) for event_time, value in JournalReader(tmp_path)] == events
+    start_time, end_time = START_TIME + timedelta(seconds=500), START_TIME + timedelta(seconds=700)
+    assert [value["value"] for _, value in JournalReader(tmp_path, start_time, end_time)] == list(range(500, 700))
+
+
+def test_truncated_segment(tmp_path):
+    with JournalWriter(tmp_path) as writer:
+        for event_time, value in zip(timestamps(START_TIME, delay=timedelta(seconds=1)), range(10)):
+            writer.write(event_time, value)
+    (segment,) = tmp_path.glob("*.log")
+    segment.write_bytes(segment.read_bytes()[:-3])
+    assert [value for _, value in JournalReader(tmp_path)] == list(range(9))
+
+
+async def test_capture_and_replay(tmp_path):
+    live = []
+    with JournalWriter(tmp_path) as writer:
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=lambda event_time, value: live.append((event_time, value)),
+                    future=create_async_generator(range(5), delay=0.01),
+                    capture=writer,
+                )
+            ]
+        )
+    replayed = []
+    await asp.run(
+        [asp.process_stream(callback=lambda *event: replayed.append(event), past=JournalReader(tmp_path))],
+        start_time=live[0][0],
+    )
+    assert replayed == live
+
+
+async def test_seek(tmp_path):
+    with JournalWriter(tmp_path, segment_size=1024, index_interval=8) as writer:
+        for event_time, value in zip(timestamps(START_TIME, delay=timedelta(seconds=1)), range(1000)):
+            writer.write(event_time, value)
+    received = []
+    await asp.run(
+        [asp.process_stream(callback=lambda _event_time, value: received.append(value), past=JournalReader(tmp_path))],
+        start_time=START_TIME + timedelta(seconds=990),
+    )
+    assert received == list(range(990, 1000))
+    reader = JournalReader(tmp_path, start_time=START_TIME + timedelta(seconds=10))
+    reader.seek(START_TIME + timedelta(seconds=990))
+    reader.seek(START_TIME + timedelta(seconds=5))
+    assert [value for _, value in reader][:2] == [10, 11]
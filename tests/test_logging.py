@@ -0,0 +1,56 @@
+import io
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import async_stream_processing as asp
+from async_stream_processing.testing import timestamps
+
+
+async def test_virtual_time_handler():
+    stream = io.StringIO()
+    handler = asp.logging.VirtualTimeHandler(stream)
+    handler.setFormatter(logging.Formatter("%(virtual_time)s %(message)s"))
+    logger = logging.getLogger("test_virtual_time_handler")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    start_time = datetime(2025, 1, 1)
+    past_values = list(zip(timestamps(start_time, delay=timedelta(seconds=1)), range(5)))
+    try:
+        await asp.run(
+            [asp.process_stream(callback=lambda _event_time, value: logger.info("value %d", value), past=past_values)],
+            start_time=start_time,
+        )
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    lines = stream.getvalue().splitlines()
+    assert [line.split(" ")[-1] for line in lines] == [str(value) for value in range(5)]
+    for line, (event_time, _) in zip(lines, past_values):
+        virtual_time = datetime.fromisoformat(line.rsplit(" ", 2)[0])
+        assert abs((virtual_time - event_time).total_seconds()) < 0.001
+    assert handler.dropped == 0
+
+
+def test_dropped_records():
+    released = threading.Event()
+    writing = threading.Event()
+
+    class BlockedStream(io.StringIO):
+        def write(self, text):
+            writing.set()
+            released.wait()
+            return super().write(text)
+
+    stream = BlockedStream()
+    handler = asp.logging.VirtualTimeHandler(stream, capacity=1)
+    records = [logging.LogRecord("test", logging.INFO, __file__, 0, f"message {i}", None, None) for i in range(3)]
+    handler.emit(records[0])
+    writing.wait()
+    handler.emit(records[1])
+    handler.emit(records[2])
+    assert handler.dropped == 1
+    released.set()
+    handler.close()
+    assert [line.split(" ", 3)[-1] for line in stream.getvalue().splitlines()] == ["test message 0", "test message 1"]
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.pacing import MAX_SPIN, Pacer
+from async_stream_processing.testing import timestamps
+
+START_TIME = datetime(2025, 1, 1)
+
+
+@pytest.mark.parametrize("speed", [10, 100])
+async def test_speed(speed: float):
+    """
+    paced events are released in order, and reported.
+    """
+    received = []
+    past_values = list(zip(timestamps(START_TIME, delay=timedelta(milliseconds=50)), range(40)))
+    await asp.run(
+        [asp.process_stream(callback=lambda event_time, _value: received.append(event_time), past=past_values)],
+        start_time=START_TIME,
+        speed=speed,
+    )
+    assert received == [event_time for event_time, _ in past_values]
+    report = asp.pacing_report()
+    assert report is not None
+    assert (report.speed, report.releases) == (speed, 40)
+    assert 0 <= report.mean_jitter <= report.max_jitter
+
+
+def test_release_schedule():
+    """
+    coroutines are released once the wall clock reaches their due time divided by speed after the start, never before.
+    """
+    wall_time = 0.0
+    pacer = Pacer(speed=10, spin=0.001, wall_clock=lambda: wall_time)
+    pacer.start(START_TIME)
+    due_time = START_TIME + timedelta(seconds=1)
+    assert pacer.delay(due_time) == pytest.approx(0.099)
+    wall_time = 0.05
+    assert pacer.release_time(due_time) == START_TIME + timedelta(seconds=0.5)
+    assert pacer.now() == START_TIME + timedelta(seconds=0.5)
+    wall_time = 0.1
+    assert pacer.release_time(due_time) == due_time
+    assert pacer.delay(due_time) == 0
+    wall_time = 0.3  # 0.1s late
+    assert pacer.release_time(START_TIME + timedelta(seconds=2)) == START_TIME + timedelta(seconds=2)
+    report = pacer.report()
+    assert (report.releases, report.achieved_speed) == (2, pytest.approx(2 / 0.3))
+    assert (report.mean_jitter, report.max_jitter) == (pytest.approx(0.05), pytest.approx(0.1))
+
+
+async def test_paced_sleep():
+    times = []
+
+    async def main():
+        for _ in range(3):
+            await asp.sleep(1)
+            times.append(asp.now())
+
+    await asp.run([main()], start_time=START_TIME, speed=20)
+    for virtual_time, seconds in zip(times, (1, 2, 3)):
+        assert virtual_time >= START_TIME + timedelta(seconds=seconds)
+    assert times == sorted(times)
+
+
+def test_spin():
+    with pytest.raises(ValueError):
+        Pacer(speed=10, spin=MAX_SPIN * 2)
+    with pytest.raises(ValueError):
+        Pacer(speed=0)
+
+
+async def test_unpaced_report():
+    await asp.run([asp.process_stream(callback=print, past=[])])
+    assert asp.pacing_report() is None
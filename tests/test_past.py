@@ -4,9 +4,9 @@ from itertools import product
 import pytest
 
 import async_stream_processing as asp
-from async_stream_processing.testing import timestamps, create_async_generator
+from async_stream_processing.testing import FakeClock, timestamps, create_async_generator
 
-TIMESTAMP_TOLERANCE = 0.001
+NOW = datetime(2025, 1, 1, 12)
 
 
 class Client:
@@ -31,14 +31,18 @@ async def test_fast_forward(method, lags):
     """
     past events are all passed at roughly the right virtual time.
     """
-    start_time = datetime.now() - timedelta(seconds=60)
+    start_time = NOW - timedelta(seconds=60)
     client = Client(start_time)
     values = list(range(10))
     past_values = list(zip(timestamps(start_time, delay=timedelta(seconds=1)), values))
-    await asp.run([asp.process_stream(callback=getattr(client, method), past=past_values)], start_time=start_time)
+    await asp.run(
+        [asp.process_stream(callback=getattr(client, method), past=past_values)],
+        start_time=start_time,
+        clock=FakeClock(NOW),
+    )
     assert len(client.greeted) == len(values)
     for (event_time, value), (expected_timestamp, expected_value), lag in zip(client.greeted, past_values, lags):
-        assert abs(event_time - lag - (expected_timestamp - start_time).total_seconds()) < TIMESTAMP_TOLERANCE
+        assert event_time - lag == (expected_timestamp - start_time).total_seconds()
         assert value == expected_value
 
 
@@ -69,10 +73,10 @@ async def test_unpack(unpack_kwargs: bool):
 
 
 @pytest.mark.parametrize(
-    "coroutine,delay", product([True, False], [None, 1, timedelta(seconds=1), datetime.now() + timedelta(seconds=1)])
+    "coroutine,delay", product([True, False], [None, 1, timedelta(seconds=1), NOW + timedelta(seconds=1)])
 )
 async def test_call_later(coroutine, delay):
-    start_time = datetime.now() - timedelta(seconds=60)
+    start_time = NOW - timedelta(seconds=60)
     called = False
 
     async def switch_flag_async(event_time: datetime):
@@ -86,19 +90,22 @@ async def test_call_later(coroutine, delay):
     async def callback():
         asp.call_later(delay, switch_flag_async if coroutine else switch_flag)
 
-    await asp.run([callback()], start_time=start_time)
+    await asp.run([callback()], start_time=start_time, clock=FakeClock(NOW))
     assert called
 
 
 async def test_future():
     """
-    - past events are all passed at roughly the right virtual time.
+    - live events are passed as they arrive, virtual time moving with the clock.
     """
-    start_time = datetime.now() - timedelta(seconds=60)
+    start_time = NOW - timedelta(seconds=60)
     client = Client(start_time)
     values = list(range(10))
     future_values = create_async_generator(values, delay=0.1)
-    await asp.run([asp.process_stream(callback=client.greet, future=future_values)], start_time=start_time)
+    await asp.run(
+        [asp.process_stream(callback=client.greet, future=future_values)], start_time=start_time, clock=FakeClock(NOW)
+    )
+    assert client.greeted == [(pytest.approx(value * 0.1), value) for value in values]
 
 
 async def test_timer():
@@ -123,7 +130,7 @@ async def test_callbacks():
     """
     - past events are all passed at roughly the right virtual time.
     """
-    start_time = datetime.now() - timedelta(seconds=60)
+    start_time = NOW - timedelta(seconds=60)
     started = False
     live = False
 
@@ -140,6 +147,38 @@ async def test_callbacks():
     await asp.run(
         [asp.process_stream(callback=print, future=future_values, on_start=start, on_live_start=live_start)],
         start_time=start_time,
+        clock=FakeClock(NOW),
     )
 
     assert started and live
+
+
+async def test_broadcast():
+    """
+    each event is read once and passed to every callback in order, at the same virtual time.
+    """
+    start_time = datetime(2025, 1, 1)
+    read = []
+    received = []
+
+    def source():
+        for event_time, value in zip(timestamps(start_time, delay=timedelta(seconds=1)), range(5)):
+            read.append(value)
+            yield event_time, (value, value * 2)
+
+    def first(_event_time: datetime, value, double):
+        received.append(("first", asp.now(), value))
+
+    async def second(_event_time: datetime, value, double):
+        await asp.sleep(0)
+        received.append(("second", asp.now(), double))
+
+    await asp.run(
+        [asp.broadcast(source(), [first, second], unpack_args=True)], start_time=start_time, clock=FakeClock(NOW)
+    )
+    assert read == list(range(5))
+    assert [(name, value) for name, _, value in received] == [
+        (name, value * factor) for value in range(5) for name, factor in (("first", 1), ("second", 2))
+    ]
+    for (_, first_time, _), (_, second_time, _) in zip(received[::2], received[1::2]):
+        assert second_time == first_time
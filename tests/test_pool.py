@@ -0,0 +1,127 @@
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, List
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing import pool
+from async_stream_processing.pool import SHARED_MEMORY_THRESHOLD
+from async_stream_processing.testing import create_async_generator, timestamps
+
+
+def square(_event_time: datetime, value: int) -> int:
+    time.sleep(0.01 * (value % 3))
+    return value * value
+
+
+def digest(_event_time: datetime, payload) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+async def test_pipeline_order():
+    """
+    results are committed in event order, at their event time.
+    """
+    start_time = datetime(2025, 1, 1)
+    past_values = list(zip(timestamps(start_time, delay=timedelta(seconds=1)), range(20)))
+    results = []
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=square,
+                    past=past_values,
+                    executor=executor,
+                    max_in_flight=8,
+                    on_result=lambda event_time, result: results.append((event_time, asp.now(), result)),
+                )
+            ],
+            start_time=start_time,
+        )
+    assert [result for _, _, result in results] == [value * value for value in range(20)]
+    for (event_time, virtual_time, _), (expected_time, _) in zip(results, past_values):
+        assert event_time == expected_time
+        assert event_time <= virtual_time < event_time + timedelta(seconds=1)
+
+
+async def test_pipeline_shared_memory():
+    start_time = datetime(2025, 1, 1)
+    payloads = [bytes([index]) * (SHARED_MEMORY_THRESHOLD * 2) for index in range(4)] + [b"small"]
+    past_values = list(zip(timestamps(start_time, delay=timedelta(seconds=1)), payloads))
+    results = []
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=digest,
+                    past=past_values,
+                    executor=executor,
+                    max_in_flight=2,
+                    on_result=lambda _event_time, result: results.append(result),
+                )
+            ],
+            start_time=start_time,
+        )
+    assert results == [hashlib.sha256(payload).hexdigest() for payload in payloads]
+
+
+def fail_first(_event_time: datetime, payload) -> str:
+    if payload[0] == 0:
+        raise ValueError("invalid payload")
+    time.sleep(0.01)
+    return digest(_event_time, payload)
+
+
+async def test_pipeline_shared_memory_released(monkeypatch: pytest.MonkeyPatch):
+    """
+    the shared memory of every event in flight is released when a callback raises.
+    """
+    created: List[str] = []
+
+    class TrackedSharedMemory(SharedMemory):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(pool, "SharedMemory", TrackedSharedMemory)
+    start_time = datetime(2025, 1, 1)
+    payloads = [bytes([index]) * (SHARED_MEMORY_THRESHOLD * 2) for index in range(4)]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError):
+            await asp.run(
+                [
+                    asp.process_stream(
+                        callback=fail_first,
+                        past=list(zip(timestamps(start_time, delay=timedelta(seconds=1)), payloads)),
+                        executor=executor,
+                        max_in_flight=4,
+                    )
+                ],
+                start_time=start_time,
+            )
+    assert len(created) == 4
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name)
+
+
+async def test_pipeline_live():
+    results = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=square,
+                    future=create_async_generator(range(10), delay=0.001),
+                    executor=executor,
+                    max_in_flight=4,
+                    on_result=lambda _event_time, result: results.append(result),
+                )
+            ],
+        )
+    assert results == [value * value for value in range(10)]
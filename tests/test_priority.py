@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import FakeClock, simulated_source
+
+NOW = datetime(2025, 1, 1, 12)
+BURST_SIZE = 200
+
+
+async def run_storm(weights):
+    """
+    execution reports arrive during a market data storm, all events being available at once.
+    :return: Number of market data events processed before the last execution report.
+    """
+    processed = []
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=lambda _event_time, index: processed.append(("market_data", index)),
+                future=simulated_source((NOW, index) for index in range(BURST_SIZE)),
+                priority="market_data",
+            ),
+            asp.process_stream(
+                callback=lambda _event_time, index: processed.append(("exec", index)),
+                future=simulated_source((NOW, index) for index in range(5)),
+                priority="exec",
+            ),
+        ],
+        weights=weights,
+        clock=FakeClock(NOW),
+    )
+    assert [index for name, index in processed if name == "market_data"] == list(range(BURST_SIZE))
+    assert [index for name, index in processed if name == "exec"] == list(range(5))
+    last_report = max(position for position, (name, _) in enumerate(processed) if name == "exec")
+    return last_report - 4
+
+
+async def test_priority():
+    assert await run_storm(None) == BURST_SIZE
+    assert await run_storm({"exec": 10, "market_data": 1}) < 10
+    assert asp.queue_depths() == {"exec": 0, "market_data": 0, "default": 0}
+
+
+async def test_past_order():
+    """
+    weights only reorder coroutines which are due at the same time, past events are still processed in order.
+    """
+    start_time = datetime(2025, 1, 1)
+    processed = []
+
+    def callback(event_time: datetime, name: str):
+        processed.append((event_time, asp.now(), name))
+
+    def source(name, seconds):
+        return [(start_time + timedelta(seconds=second), name) for second in seconds]
+
+    await asp.run(
+        [
+            asp.process_stream(callback=callback, past=source("md", (0, 2, 4)), priority="md"),
+            asp.process_stream(callback=callback, past=source("md2", (0, 2, 4)), priority="md"),
+            asp.process_stream(callback=callback, past=source("exec", (1, 2, 3, 5)), priority="exec"),
+        ],
+        start_time=start_time,
+        weights={"exec": 10, "md": 1},
+        clock=FakeClock(NOW),
+    )
+    assert [event_time for event_time, _, _ in processed] == sorted(event_time for event_time, _, _ in processed)
+    assert all(virtual_time == event_time for event_time, virtual_time, _ in processed)
+    assert [name for event_time, _, name in processed if event_time == start_time + timedelta(seconds=2)] == [
+        "exec",
+        "md",
+        "md2",
+    ]
+
+
+async def test_inherited_priority():
+    """
+    callbacks scheduled by a stream inherit its priority class.
+    """
+    calls = []
+
+    def arm(_event_time: datetime, name: str):
+        for index in range(3):
+            asp.call_later(1, lambda _event_time, index=index: calls.append((name, index)))
+
+    start_time = datetime(2025, 1, 1)
+    await asp.run(
+        [
+            asp.process_stream(callback=arm, past=[(start_time, "low")]),
+            asp.process_stream(callback=arm, past=[(start_time, "high")], priority="high"),
+        ],
+        start_time=start_time,
+        weights={"high": 2},
+        clock=FakeClock(NOW),
+    )
+    assert [name for name, _ in calls] == ["high", "high", "low", "high", "low", "low"]
+    with pytest.raises(ValueError):
+        await asp.run([asp.process_stream(callback=print, priority="unknown")], weights={"high": 2})
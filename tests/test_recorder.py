@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import timestamps
+
+
+async def record_prices(recorder: asp.Recorder, count: int):
+    start_time = datetime(2025, 1, 1)
+    past_values = list(zip(timestamps(start_time, delay=timedelta(seconds=1)), range(count)))
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=lambda _event_time, value: recorder.record(value * 1.5, value, f"#{value}"),
+                past=past_values,
+            )
+        ],
+        start_time=start_time,
+        recorders=[recorder],
+    )
+    return past_values
+
+
+async def test_record_npz(tmp_path):
+    np = pytest.importorskip("numpy")
+    recorder = asp.Recorder(tmp_path / "prices.npz", {"price": "d", "quantity": "q", "label": "O"})
+    past_values = await record_prices(recorder, 10)
+    assert recorder.row_count == 10
+    result = np.load(tmp_path / "prices.npz", allow_pickle=True)
+    assert result["price"].tolist() == [value * 1.5 for value in range(10)]
+    assert result["quantity"].tolist() == list(range(10))
+    assert result["label"].tolist() == [f"#{value}" for value in range(10)]
+    for recorded, (event_time, _) in zip(result["virtual_time"].tolist(), past_values):
+        assert abs((recorded - event_time).total_seconds()) < 0.001
+
+
+async def test_record_parquet_chunks(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    recorder = asp.Recorder(tmp_path / "prices.parquet", {"price": "d", "quantity": "q", "label": "O"}, chunk_size=4)
+    await record_prices(recorder, 10)
+    chunks = sorted(tmp_path.glob("prices-*.parquet"))
+    assert [chunk.name for chunk in chunks] == [f"prices-{index:05d}.parquet" for index in range(3)]
+    quantities = [value for chunk in chunks for value in pq.read_table(chunk)["quantity"].to_pylist()]
+    assert quantities == list(range(10))
+
+
+def test_invalid_columns(tmp_path):
+    with pytest.raises(ValueError):
+        asp.Recorder(tmp_path / "prices.csv", {"price": "d"})
+    with pytest.raises(ValueError):
+        asp.Recorder(tmp_path / "prices.npz", {"price": "u"})
+    recorder = asp.Recorder(tmp_path / "prices.npz", {"price": "d", "quantity": "q"})
+    with pytest.raises(ValueError):
+        recorder.record(1.5)
+    with pytest.raises(ValueError):
+        recorder.record(1.5, 1, "extra")
+    assert len(recorder) == 0
+
+
+async def test_invalid_values(tmp_path):
+    """
+    a row with a value of the wrong type is not recorded, and leaves the columns with the same length.
+    """
+    recorder = asp.Recorder(tmp_path / "prices.npz", {"price": "d", "quantity": "q", "label": "O"})
+
+    async def record():
+        recorder.record(1.5, 1, "#1")
+        with pytest.raises(TypeError):
+            recorder.record(2.5, "2", "#2")
+        recorder.record(3.5, 3, "#3")
+
+    await asp.run([record()], start_time=datetime(2025, 1, 1))
+    assert [list(column) for column in recorder.columns.values()][1:] == [[1.5, 3.5], [1, 3], ["#1", "#3"]]
+    assert len(recorder.columns["virtual_time"]) == 2
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import timestamps
+
+START_TIME = datetime(2025, 1, 1)
+PRICES = [10, 12, 9, 11, 13, 8, 10, 14, 12, 11]
+
+
+class BaseStrategy:
+    """
+    buys when the price drops below a threshold and sells a second later.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.trades: List[Tuple[str, datetime, float]] = []
+
+    def check(self, price: float):
+        if price < self.threshold:
+            self.trades.append(("buy", asp.now(), price))
+            asp.call_later(1, self.sell, price)
+
+    def sell(self, _event_time: datetime, price: float):
+        self.trades.append(("sell", asp.now(), price))
+
+
+class Strategy(BaseStrategy):
+    def on_price(self, _event_time: datetime, price: float):
+        self.check(price)
+
+
+class AsyncStrategy(BaseStrategy):
+    async def on_price(self, _event_time: datetime, price: float):
+        await asp.sleep(0.5)
+        self.check(price)
+
+
+def past_values():
+    return list(zip(timestamps(START_TIME, delay=timedelta(seconds=2)), PRICES))
+
+
+def rounded(trades):
+    return [(side, virtual_time.replace(microsecond=0), price) for side, virtual_time, price in trades]
+
+
+@pytest.mark.parametrize("strategy_class", [Strategy, AsyncStrategy])
+async def test_scenarios(strategy_class):
+    """
+    scenarios run in lockstep behave as if they were run on their own, virtual time only moving with due times.
+    """
+    read = []
+
+    def source():
+        for event in past_values():
+            read.append(event)
+            yield event
+
+    strategies = [strategy_class(threshold) for threshold in (9, 10, 12)]
+    await asp.run_scenarios(source(), [strategy.on_price for strategy in strategies])
+    assert len(read) == len(PRICES)
+    for strategy in strategies:
+        alone = strategy_class(strategy.threshold)
+        await asp.run([asp.process_stream(callback=alone.on_price, past=past_values())], start_time=START_TIME)
+        assert strategy.trades and rounded(strategy.trades) == rounded(alone.trades)
+    last_sell = START_TIME + timedelta(seconds=11.5 if strategy_class is AsyncStrategy else 11)
+    assert strategies[0].trades[-1] == ("sell", last_sell, 8)
+
+
+async def test_named_sources():
+    received = []
+    await asp.run_scenarios(
+        {"a": asp.ListSource(past_values()), "b": asp.ListSource(past_values())},
+        [lambda _event_time, name, price: received.append((name, price))],
+        start_time=START_TIME + timedelta(seconds=15),
+        unpack_args=True,
+    )
+    assert received == [("a", 12), ("b", 12), ("a", 11), ("b", 11)]
+
+
+async def test_only_sleep():
+    async def wait_for_something(_event_time, _value):
+        await asyncio.sleep(0)
+
+    with pytest.raises(RuntimeError):
+        await asp.run_scenarios(past_values(), [wait_for_something])
@@ -0,0 +1,227 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import FakeClock, simulated_source, timestamps
+
+NOW = datetime(2025, 1, 1, 12)
+
+
+async def test_reorder():
+    received = []
+    late = []
+    # events arrive every 10ms, some of them later than their event time
+    latencies = [0, 0.025, 0, 0.025, 0, 0.24, 0]
+    events = [(NOW + timedelta(seconds=0.01 * (index + 1) - latency), index) for index, latency in enumerate(latencies)]
+    clock = FakeClock(NOW)
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=lambda event_time, value: received.append((event_time, value)),
+                future=simulated_source(events, latency=lambda _event_time, index: latencies[index]),
+                max_lateness=0.05,
+                on_late=lambda event_time, value: late.append(value),
+            )
+        ],
+        clock=clock,
+    )
+    event_times = [event_time for event_time, _ in received]
+    assert event_times == sorted(event_times)
+    assert [value for _, value in received] == [1, 0, 3, 2, 4, 6]
+    assert late == [5]
+    # timers armed to release buffered events are cancelled once an event arrives first
+    assert all(future.done() for _, _, future in clock.timers)
+
+
+async def test_reorder_quiet_source():
+    """
+    buffered events are released once the maximum lateness has elapsed, even if no other event arrives.
+    """
+    released = []
+    clock = FakeClock(NOW)
+
+    async def quiet_events():
+        yield clock.now(), "first"
+        await clock.sleep(0.2)
+
+    reorder_buffer = asp.ReorderBuffer(quiet_events(), max_lateness=0.05)
+
+    async def consume():
+        async for _event_time, value in reorder_buffer:
+            released.append((value, clock.now()))
+
+    await asp.run([consume()], clock=clock)
+    assert released == [("first", NOW + timedelta(seconds=0.05))]
+    assert reorder_buffer.late_count == 0
+
+
+async def test_prefetch():
+    """
+    reading past events overlaps with processing them: the next event is read while the callback processes one.
+    """
+    start_time = datetime(2025, 1, 1)
+    processing = threading.Event()
+    read_ahead = threading.Event()
+    overlapped = []
+
+    def source():
+        yield start_time, 0
+        overlapped.append(processing.wait(timeout=5))
+        read_ahead.set()
+        yield start_time + timedelta(seconds=1), 1
+
+    received = []
+
+    def callback(_event_time: datetime, value):
+        if value == 0:
+            processing.set()
+            overlapped.append(read_ahead.wait(timeout=5))
+        received.append(value)
+
+    await asp.run(
+        [asp.process_stream(callback=callback, past=asp.Prefetch(source(), chunk_size=1))],
+        start_time=start_time,
+    )
+    assert received == [0, 1]
+    assert overlapped == [True, True]
+
+
+def test_prefetch_errors():
+    def failing_source():
+        yield datetime(2025, 1, 1), 0
+        raise ValueError("corrupted")
+
+    iterator = iter(asp.Prefetch(failing_source(), chunk_size=1))
+    assert next(iterator) == (datetime(2025, 1, 1), 0)
+    with pytest.raises(ValueError):
+        next(iterator)
+
+
+def test_prefetch_stops_reading():
+    read = []
+
+    def infinite_source():
+        for value in count():
+            read.append(value)
+            yield datetime(2025, 1, 1), value
+
+    threads = set(threading.enumerate())
+    iterator = iter(asp.Prefetch(infinite_source(), chunk_size=10, depth=2))
+    next(iterator)
+    (reader,) = set(threading.enumerate()) - threads
+    iterator.close()
+    read_before_close = len(read)
+    reader.join(timeout=5)
+    assert not reader.is_alive()
+    # at most the chunk being read when closed
+    assert len(read) - read_before_close <= 10
+
+
+async def test_async_past():
+    """
+    asynchronous past sources are replayed in virtual time, in order with other streams.
+    """
+    start_time = datetime(2025, 1, 1)
+    received = []
+
+    async def cursor(offset: int):
+        for index in range(offset, 100, 2):
+            if index % 10 == offset:
+                await asyncio.sleep(0.001)  # simulate fetching the next page
+            yield start_time + timedelta(seconds=index), index
+
+    def callback(event_time: datetime, value):
+        received.append((event_time, asp.now(), value))
+
+    async def async_callback(event_time: datetime, value):
+        callback(event_time, value)
+
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=callback, past=[(start_time + timedelta(seconds=i), i) for i in range(0, 100, 2)]
+            ),
+            asp.process_stream(callback=callback, past=cursor(1)),
+            asp.process_stream(callback=async_callback, past=cursor(0)),
+        ],
+        start_time=start_time,
+    )
+    assert [value for _, _, value in received] == sorted(list(range(100)) + list(range(0, 100, 2)))
+    for event_time, virtual_time, _ in received:
+        assert event_time <= virtual_time < event_time + timedelta(seconds=1)
+
+
+async def test_async_past_errors():
+    async def failing_cursor():
+        yield datetime(2025, 1, 1), 0
+        raise ValueError("connection lost")
+
+    with pytest.raises(ValueError):
+        await asp.run([asp.process_stream(callback=print, past=failing_cursor())], start_time=datetime(2025, 1, 1))
+
+
+class CountingEvents(list):
+    """
+    list counting how many of its events are read.
+    """
+
+    read = 0
+
+    def __getitem__(self, index):
+        self.read += 1
+        return super().__getitem__(index)
+
+
+async def test_seek():
+    start_time = datetime(2025, 1, 1)
+    events = CountingEvents(zip(timestamps(start_time, delay=timedelta(seconds=1)), range(100_000)))
+    received = []
+    seek_time = start_time + timedelta(seconds=99_990)
+    await asp.run(
+        [asp.process_stream(callback=lambda _event_time, value: received.append(value), past=asp.ListSource(events))],
+        start_time=seek_time,
+    )
+    assert received == list(range(99_990, 100_000))
+    assert events.read < 100
+    assert isinstance(asp.Prefetch(asp.ListSource(events)), asp.Seekable)
+    assert not isinstance(events, asp.Seekable)
+
+
+async def test_prefetch_not_seekable():
+    """
+    a prefetched source which is not seekable is replayed from its beginning, unless seeking is required.
+    """
+    start_time = datetime(2025, 1, 1)
+    received = []
+
+    def source():
+        return asp.Prefetch(event for event in zip(timestamps(start_time, delay=timedelta(seconds=1)), range(10)))
+
+    def process():
+        return asp.process_stream(callback=lambda _event_time, value: received.append(value), past=source())
+
+    await asp.run([process()], start_time=start_time + timedelta(seconds=5))
+    assert received == list(range(10))
+    with pytest.raises(asp.NotSeekable):
+        await asp.run([process()], start_time=start_time + timedelta(seconds=5), require_seek=True)
+
+
+async def test_seek_array():
+    numpy = pytest.importorskip("numpy")
+    start_time = datetime(2025, 1, 1)
+    event_times = numpy.datetime64(start_time, "us") + numpy.arange(1000) * numpy.timedelta64(1, "s")
+    received = []
+    await asp.run(
+        [
+            asp.process_stream(
+                callback=lambda event_time, value: received.append((event_time, value)),
+                past=asp.Prefetch(asp.ArraySource(event_times, list(range(1000)))),
+            )
+        ],
+        start_time=start_time + timedelta(seconds=997, milliseconds=500),
+    )
+    assert received == [(start_time + timedelta(seconds=index), index) for index in range(998, 1000)]
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from functools import partial
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing import processor as engine
+from async_stream_processing.testing import FakeClock, timestamps
+
+START_TIME = datetime(2025, 1, 1)
+ORDER_COUNT = 2000
+
+
+class Book:
+    """
+    orders expiring after a time to live of up to a day, most of them far beyond the events that arm them.
+    """
+
+    def __init__(self):
+        self.expired = []
+        self.max_scheduled = 0
+
+    def on_order(self, event_time: datetime, order_id: int):
+        asp.call_later(timedelta(seconds=order_id * 7919 % 86_400), self.expire, order_id)
+        self.max_scheduled = max(self.max_scheduled, len(engine.processor.scheduled_coroutines))
+
+    def expire(self, expiry_time: datetime, order_id: int):
+        self.expired.append((expiry_time, order_id))
+        self.max_scheduled = max(self.max_scheduled, len(engine.processor.scheduled_coroutines))
+
+
+async def run_book(spill=None) -> Book:
+    book = Book()
+    orders = zip(timestamps(START_TIME, delay=timedelta(seconds=1)), range(ORDER_COUNT))
+    await asp.run(
+        [asp.process_stream(callback=book.on_order, past=orders)],
+        start_time=START_TIME,
+        clock=FakeClock(START_TIME + timedelta(days=7)),
+        spill=spill,
+    )
+    return book
+
+
+async def test_spill(tmp_path):
+    """
+    timers spilled to disk expire at the same virtual time and in the same order as timers kept in memory.
+    """
+    expected = await run_book()
+    spill = asp.SpillStore(tmp_path, horizon=timedelta(minutes=10), bucket_size=timedelta(minutes=10), buffer_size=4096)
+    book = await run_book(spill)
+    assert book.expired == expected.expired
+    assert len(book.expired) == ORDER_COUNT
+    assert spill.spilled_count > ORDER_COUNT * 0.9
+    assert len(spill) == 0
+    assert book.max_scheduled < expected.max_scheduled / 5
+    assert not list(tmp_path.iterdir())
+    # instances are only kept in memory while they have spilled timers
+    assert not spill.owners
+    # the store belongs to the caller, who can reuse it
+    assert (await run_book(spill)).expired == expected.expired
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, _event_time: datetime):
+        self.count += 1
+
+    def increment(self, _event_time: datetime, step: int):
+        self.count += step
+
+
+async def test_spill_fallback():
+    """
+    timers which cannot be pickled, coroutines, and callables which would be copied when pickled stay in memory.
+    """
+    called = []
+    counter = Counter()
+
+    async def arm():
+        asp.call_later(timedelta(days=1), lambda event_time: called.append("lambda"))
+        asp.call_later(timedelta(days=2), record("coroutine"))
+        asp.call_later(timedelta(days=3), counter)
+        asp.call_later(timedelta(days=3), partial(counter.increment, step=2))
+
+    async def record(name):
+        called.append(name)
+
+    with asp.SpillStore(horizon=60) as spill:
+        await asp.run([arm()], start_time=START_TIME, spill=spill)
+        assert spill.directory.exists()
+    assert called == ["lambda", "coroutine"]
+    assert counter.count == 3
+    assert spill.spilled_count == 0
+    assert not spill.directory.exists()
+    with pytest.raises(ValueError):
+        await asp.run([], start_time=START_TIME, spill=spill)
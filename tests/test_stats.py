@@ -0,0 +1,76 @@
+import math
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from async_stream_processing.stats import EWMA, QuantileSketch, Welford
+
+
+def test_welford():
+    generator = random.Random(42)
+    values = [generator.gauss(10, 3) for _ in range(1000)]
+    running = Welford()
+    for value in values:
+        running.update(value)
+    assert running.count == 1000
+    assert running.mean == pytest.approx(statistics.mean(values))
+    assert running.variance == pytest.approx(statistics.variance(values))
+    first, second = Welford(), Welford()
+    for value in values[:300]:
+        first.update(value)
+    for value in values[300:]:
+        second.update(value)
+    first.merge(second)
+    assert (first.count, first.mean, first.variance) == pytest.approx((1000, running.mean, running.variance))
+    assert math.isnan(Welford().variance)
+
+
+def test_ewma():
+    start_time = datetime(2025, 1, 1)
+    average = EWMA(half_life=timedelta(minutes=1))
+    assert average.update(start_time, 0) == 0
+    assert average.update(start_time + timedelta(minutes=1), 1) == pytest.approx(0.5)
+    # the longer the gap, the less the previous values weigh
+    assert average.update(start_time + timedelta(minutes=3), 0) == pytest.approx(0.125)
+
+
+def test_quantile_sketch():
+    generator = random.Random(42)
+    values = [generator.lognormvariate(0, 2) * generator.choice([-1, 1]) for _ in range(10_000)] + [0] * 100
+    sketch, first, second = QuantileSketch(0.01), QuantileSketch(0.01), QuantileSketch(0.01)
+    for index, value in enumerate(values):
+        sketch.update(value)
+        (first if index % 2 else second).update(value)
+    first.merge(second)
+    ordered = sorted(values)
+    for q in (0, 0.01, 0.25, 0.5, 0.75, 0.99, 1):
+        expected = ordered[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(expected, rel=0.011, abs=1e-12)
+        assert first.quantile(q) == sketch.quantile(q)
+    assert len(sketch.positive) + len(sketch.negative) < 2000
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(0.05))
+
+
+def test_quantile_sketch_memory():
+    sketch = QuantileSketch(0.01, max_buckets=100)
+    for exponent in range(-300, 300):
+        sketch.update(10.0**exponent)
+    assert len(sketch.positive) == 100
+    assert sketch.quantile(1) == 1e299
+    assert sketch.quantile(0.99) == pytest.approx(10.0**293, rel=0.011)
+
+
+def test_quantile_sketch_collapse():
+    """
+    collapsed buckets count the values below them and keep the total count.
+    """
+    sketch = QuantileSketch(0.01, max_buckets=3)
+    for value in (1.0, 10.0, 100.0, 1000.0, 0.5, 10000.0):
+        sketch.update(value)
+    assert sorted(sketch.positive) == [sketch.index(100.0), sketch.index(1000.0), sketch.index(10000.0)]
+    assert sketch.positive[sketch.index(100.0)] == 4
+    assert sketch.positive.lowest == sketch.index(100.0)
+    assert sum(sketch.positive.values()) == sketch.count == 6
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import async_stream_processing as asp
+from async_stream_processing.store import SQLiteStore
+from async_stream_processing.testing import timestamps
+
+START_TIME = datetime(2025, 1, 1, 10)
+
+
+def fill(store: SQLiteStore):
+    store.extend("X", zip(timestamps(START_TIME, delay=timedelta(minutes=1)), range(120)))
+    store.extend("Y", zip(timestamps(START_TIME + timedelta(seconds=30), delay=timedelta(minutes=1)), range(120)))
+    store.append("Z", START_TIME, {"price": 1.5})
+
+
+def test_query(tmp_path):
+    with SQLiteStore(tmp_path / "history.db", batch_size=7) as store:
+        fill(store)
+        assert store.streams() == ["X", "Y", "Z"]
+        assert list(store.query("Z")) == [(START_TIME, {"price": 1.5})]
+        events = list(store.query("X", START_TIME + timedelta(minutes=10), START_TIME + timedelta(minutes=20)))
+        assert [value for _, value in events] == list(range(10, 20))
+        assert events[0][0] == START_TIME + timedelta(minutes=10)
+
+
+def test_query_many(tmp_path):
+    with SQLiteStore(tmp_path / "history.db", batch_size=7) as store:
+        fill(store)
+        events = list(store.query(["X", "Y"], START_TIME, START_TIME + timedelta(hours=1)))
+    assert len(events) == 120
+    assert [event_time for event_time, _ in events] == sorted(event_time for event_time, _ in events)
+    assert [stream for _, (stream, _) in events[:4]] == ["X", "Y", "X", "Y"]
+
+
+async def test_replay(tmp_path):
+    received = []
+    with SQLiteStore(tmp_path / "history.db") as store:
+        fill(store)
+        await asp.run(
+            [
+                asp.process_stream(
+                    callback=lambda event_time, stream, value: received.append((event_time, stream, value)),
+                    past=store.query(
+                        ["X", "Y"], START_TIME + timedelta(minutes=30), START_TIME + timedelta(minutes=31)
+                    ),
+                    unpack_args=True,
+                )
+            ],
+            start_time=START_TIME,
+        )
+    assert received == [
+        (START_TIME + timedelta(minutes=30), "X", 30),
+        (START_TIME + timedelta(minutes=30, seconds=30), "Y", 30),
+    ]
+
+
+async def test_seek(tmp_path):
+    received = []
+    with SQLiteStore(tmp_path / "history.db") as store:
+        fill(store)
+        await asp.run(
+            [asp.process_stream(callback=lambda _event_time, value: received.append(value), past=store.query("X"))],
+            start_time=START_TIME + timedelta(minutes=118),
+        )
+    assert received == [118, 119]
+
+
+def test_query_seek(tmp_path):
+    """
+    seeking is absolute, within the time range of the query, and queries can be iterated on another thread.
+    """
+    with SQLiteStore(tmp_path / "history.db") as store:
+        fill(store)
+        query = store.query("X", START_TIME + timedelta(minutes=10))
+        query.seek(START_TIME + timedelta(minutes=118))
+        assert [value for _, value in query] == [118, 119]
+        query.seek(START_TIME)
+        assert list(asp.Prefetch(query, chunk_size=7)) == list(
+            zip(timestamps(START_TIME + timedelta(minutes=10), delay=timedelta(minutes=1)), range(10, 120))
+        )
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.testing import FakeClock, create_async_generator, simulated_source, timestamps
+
+NOW = datetime(2025, 1, 1, 12)
+
+
+async def test_fake_clock():
+    """
+    a day of live events, timers and sleeps runs in simulated time, ie: instantly and deterministically.
+    """
+    received = []
+    events = list(zip(timestamps(NOW, delay=timedelta(minutes=1)), range(24 * 60)))
+
+    async def on_event(event_time: datetime, value: int):
+        await asp.sleep(0.5)
+        received.append((asp.now() - event_time, value))
+        asp.call_later(timedelta(hours=1), lambda _event_time: received.append((timedelta(hours=1), None)))
+
+    started = time.perf_counter()
+    await asp.run(
+        [asp.process_stream(callback=on_event, future=simulated_source(events, latency=0.25))],
+        start_time=NOW,
+        clock=FakeClock(NOW),
+    )
+    assert time.perf_counter() - started < 5
+    assert [value for _, value in received if value is not None] == list(range(24 * 60))
+    assert {lag for lag, value in received if value is not None} == {timedelta(seconds=0.75)}
+    assert len(received) == 2 * 24 * 60
+
+
+async def test_advance():
+    clock = FakeClock(NOW)
+    timer = clock.timer(1)
+    clock.advance(0.5)
+    assert not timer.done()
+    clock.advance(timedelta(seconds=0.5))
+    assert timer.done() and clock.now() == NOW + timedelta(seconds=1)
+
+
+async def test_clock_and_speed():
+    with pytest.raises(ValueError):
+        await asp.run([], speed=10, clock=FakeClock(NOW))
+
+
+async def test_executor():
+    """
+    the clock does not move while callbacks run in an executor, although other sources have timers armed.
+    """
+    clock = FakeClock(NOW)
+    times = []
+
+    def on_event(_event_time: datetime, _value: int):
+        started = clock.now()
+        time.sleep(0.01)
+        times.append((started, clock.now()))
+
+    events = zip(timestamps(NOW, delay=timedelta(seconds=1)), range(5))
+    ticks = zip(timestamps(NOW, delay=timedelta(seconds=0.001)), range(10_000))
+    with ThreadPoolExecutor(1) as executor:
+        await asp.run(
+            [
+                asp.process_stream(callback=on_event, future=simulated_source(events), executor=executor),
+                asp.process_stream(callback=lambda _event_time, _value: None, future=simulated_source(ticks)),
+            ],
+            start_time=NOW,
+            clock=clock,
+        )
+    assert [started for started, _ in times] == [ended for _, ended in times]
+
+
+async def test_sources_without_processor(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(asp.processor, "processor", None)
+    assert [value async for _, value in simulated_source([(NOW, 1)])] == [1]
+    assert [value async for _, value in create_async_generator([1, 2], delay=0)] == [1, 2]
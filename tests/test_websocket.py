@@ -0,0 +1,130 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+import async_stream_processing as asp
+from async_stream_processing.websocket import WebSocketSource
+
+websockets = pytest.importorskip("websockets")
+
+
+async def test_reconnect():
+    """
+    messages sent before and after an abnormal closure are all received, the stream ends once the server closes.
+    """
+    connections = []
+
+    async def handler(websocket):
+        count = int(await websocket.recv())
+        start = 5 * len(connections)
+        connections.append(count)
+        for index in range(start, start + 5):
+            await websocket.send(json.dumps({"index": index, "sent": datetime.now().isoformat()}))
+        await websocket.close(code=1011 if len(connections) == 1 else 1000)
+
+    async def subscribe(connection):
+        await connection.send("5")
+
+    received = []
+    async with websockets.serve(handler, "localhost", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            source = WebSocketSource(
+                f"ws://localhost:{port}",
+                decode="json",
+                timestamp=lambda message: datetime.fromisoformat(message["sent"]),
+                on_connect=subscribe,
+                executor=executor,
+                initial_backoff=0.01,
+                stop_on_close=True,
+            )
+            await asp.run(
+                [asp.process_stream(callback=lambda _event_time, message: received.append(message), future=source)]
+            )
+    assert [message["index"] for message in received] == list(range(10))
+    assert [connection.messages for connection in source.connections] == [5, 5]
+    assert all(connection.disconnected_at is not None for connection in source.connections)
+    assert 0 <= source.connections[0].max_lag < 1
+    assert source.batch_count <= 10
+
+
+async def test_batches():
+    @asynccontextmanager
+    async def connect(_uri: str):
+        async def messages():
+            for index in range(100):
+                yield str(index)
+
+        yield messages()
+
+    source = WebSocketSource("ws://test", decode=int, stop_on_close=True, connect=connect)
+    received = []
+    await asp.run([asp.process_stream(callback=lambda _event_time, value: received.append(value), future=source)])
+    assert received == list(range(100))
+    assert source.batch_count < 10
+
+
+async def test_max_buffer():
+    """
+    the connection is no longer read from once max_buffer messages are waiting to be dispatched.
+    """
+    read = []
+
+    @asynccontextmanager
+    async def connect(_uri: str):
+        async def messages():
+            for index in range(100):
+                read.append(index)
+                yield index
+
+        yield messages()
+
+    source = WebSocketSource("ws://test", stop_on_close=True, connect=connect, max_buffer=10)
+    read_ahead = []
+
+    def callback(_event_time, value):
+        read_ahead.append(len(read) - value)
+
+    await asp.run([asp.process_stream(callback=callback, future=source)])
+    assert len(read_ahead) == 100
+    assert max(read_ahead) <= 12  # buffered messages, plus the ones being fetched and put
+
+
+async def test_decode_errors():
+    @asynccontextmanager
+    async def connect(_uri: str):
+        async def messages():
+            for message in ["1", "two", "3"]:
+                yield message
+
+        yield messages()
+
+    errors = []
+    source = WebSocketSource(
+        "ws://test",
+        decode=int,
+        stop_on_close=True,
+        connect=connect,
+        on_decode_error=lambda message, error: errors.append((message, type(error))),
+    )
+    received = []
+    await asp.run([asp.process_stream(callback=lambda _event_time, value: received.append(value), future=source)])
+    assert received == [1, 3]
+    assert errors == [("two", ValueError)]
+    assert source.connections[0].decode_errors == 1
+
+
+async def test_max_retries():
+    attempts = []
+
+    def connect(uri: str):
+        attempts.append(uri)
+        raise OSError("connection refused")
+
+    source = WebSocketSource("ws://test", initial_backoff=0.001, max_retries=2, connect=connect)
+    with pytest.raises(OSError):
+        await asp.run([asp.process_stream(callback=print, future=source)])
+    assert len(attempts) == 3